@@ -5,13 +5,13 @@ import time
 import os
 import asyncio
 import traceback
-from typing import Any, Callable
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
 import aiohttp
 import discord
 from tortoise import Tortoise
 import config, cogs
 
-from cogs.utils import HelpCommand
+from cogs.utils import HelpCommand, GuildPolicy, ResponseCounters, guild_configs, normalize_keyword
 from async_property import async_property
 from discord.ext import commands
 
@@ -20,6 +20,7 @@ from discord.ext.commands.errors import (
 )
 
 from models import Response
+from models.migrations import migrate
 
 
 os.environ["JISHAKU_HIDE"] = "True"
@@ -44,7 +45,10 @@ class Whiskey(commands.Bot):
         self._BotBase__cogs = commands.core._CaseInsensitiveDict()
 
         self.persistent_views_added = False
-        self.support_channels = set()
+        self.support_channels: Dict[int, GuildPolicy] = {}
+        self.response_counters = ResponseCounters(self)
+        # command names a response keyword can't take, rebuilt whenever extensions change
+        self.reserved_names: FrozenSet[str] = frozenset()
 
     @property
     def config(self):
@@ -68,22 +72,66 @@ class Whiskey(commands.Bot):
             except Exception:
                 traceback.print_exc()
 
+    @staticmethod
+    def _invocations(cmd: commands.Command) -> List[str]:
+        """every way of spelling a command, parent group names and aliases included"""
+        names = (cmd.name, *cmd.aliases)
+        if cmd.parent is None:
+            return list(names)
+
+        return [f"{parent} {name}" for parent in Whiskey._invocations(cmd.parent) for name in names]
+
+    def refresh_reserved_names(self) -> None:
+        # normalized so "RList" or "r-list" can't sneak past a reserved "rlist"
+        self.reserved_names = frozenset(
+            normalize_keyword(name) for cmd in self.walk_commands() for name in self._invocations(cmd)
+        )
+
+    async def load_extension(self, name: str, *, package: Optional[str] = None) -> None:
+        await super().load_extension(name, package=package)
+        self.refresh_reserved_names()
+
+    async def unload_extension(self, name: str, *, package: Optional[str] = None) -> None:
+        await super().unload_extension(name, package=package)
+        self.refresh_reserved_names()
+
+    async def reload_extension(self, name: str, *, package: Optional[str] = None) -> None:
+        await super().reload_extension(name, package=package)
+        self.refresh_reserved_names()
+
     async def init_whiskey(self) -> None:
         self.session = aiohttp.ClientSession()
         await Tortoise.init(self.config.TORTOISE)
         await Tortoise.generate_schemas(safe=True)
+        await migrate(self.db)
 
         for mname, model in Tortoise.apps.get("models").items():
             model.bot = self
 
+        self.response_counters.start()
+
         async for record in Response.all():
-            [self.support_channels.add(channel_id) for channel_id in record.valid_channel_ids]
+            policy = GuildPolicy.from_record(record)
+            for channel_id in policy.channel_ids:
+                self.support_channels[channel_id] = policy
+
+    def cache_support_policy(self, record: Response) -> None:
+        """point every support channel of the record's guild at its current settings"""
+        guild_configs.put(record)
+        for channel_id, policy in list(self.support_channels.items()):
+            if policy.guild_id == record.guild_id:
+                del self.support_channels[channel_id]
+
+        policy = GuildPolicy.from_record(record)
+        for channel_id in policy.channel_ids:
+            self.support_channels[channel_id] = policy
 
     async def on_ready(self) -> None:
         if not self.persistent_views_added:
-            from cogs.views import SelfRoles
+            from cogs.views import SelfRoles, VoteButton
 
             self.add_view(SelfRoles(), message_id=884468160655425536)
+            self.add_dynamic_items(VoteButton)
 
             self.persistent_views_added = True
 
@@ -91,6 +139,7 @@ class Whiskey(commands.Bot):
 
     async def close(self):
         await super().close()
+        await self.response_counters.close()
         await self.session.close()
 
     @async_property
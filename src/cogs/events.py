@@ -1,90 +1,95 @@
 from __future__ import annotations
-import asyncio
 
+import asyncio
 import typing
-import re
 
-from cogs.utils.cache import get_guild_keywords
-from cogs.utils.defaults import get_best_match
+from cogs.utils.cache import LRUCache, get_guild_snapshot
 
 if typing.TYPE_CHECKING:
     from bot import Whiskey
 
 
 from discord.ext import commands
-from models import ResponseData, Response
+from discord.utils import MISSING
 
 import discord
-from constants import COLOR, DEADSHOT, GENERAL, HEAD_GUILD
+from constants import (
+    COLOR,
+    GENERAL,
+    HEAD_GUILD,
+    MATCH_ENGINE,
+    MATCH_THRESHOLD,
+    MATCH_WINDOWED,
+    OFFLOAD_MIN_COST,
+)
 
 from contextlib import suppress
-from unicodedata import normalize
 import random
-from .utils import response_ignore_check
+from .utils import (
+    OffloadedMatcher,
+    clean_nickname,
+    normalize_message,
+    response_ignore_check,
+    result_key,
+)
+from .views import ResponseVotes
 
 
 class WhiskeyEvents(commands.Cog):
     def __init__(self, bot: Whiskey) -> None:
         self.bot = bot
-        self.reactions = ("\N{THUMBS UP SIGN}", "\N{THUMBS DOWN SIGN}")
+        self.matcher = OffloadedMatcher(
+            MATCH_ENGINE, threshold=MATCH_THRESHOLD, windowed=MATCH_WINDOWED, min_cost=OFFLOAD_MIN_COST
+        )
+
+        # cleaned names by (member id, display name), each name is cleaned and edited at most once
+        self._clean_names: LRUCache[typing.Tuple[int, str], str] = LRUCache(4096)
+
+    async def cog_unload(self) -> None:
+        self.matcher.close()
 
     @commands.Cog.listener(name="on_message")
     async def on_smart_response(self, message: discord.Message) -> None:
         if not message.guild or message.author.bot or not message.content:
             return
 
-        if message.channel.id not in self.bot.support_channels:
+        policy = self.bot.support_channels.get(message.channel.id)
+        if policy is None:
             return
 
-        channel_id = message.channel.id
-
-        record = await Response.get_or_none(valid_channel_ids__contains=channel_id)
-        if not record:
-            return self.bot.support_channels.remove(channel_id)
-
-        if response_ignore_check(message.author, record.ignored_ids):
+        if response_ignore_check(message.author, policy.ignored_ids):
             return
 
-        guild_keywords = await get_guild_keywords(message.guild.id)
-
-        matches = get_best_match(guild_keywords, re.sub(r"<@*#*!*&*\d+>|[^\w\s]", "", message.content))
-        if not matches:
+        # normalized once, the keywords were when they got saved
+        text = normalize_message(message.content)
+        if not text:
             return
 
-        match = matches[0]
-
-        if match.confidence >= 68.5:
-            response = await record.data.filter(keywords__icontains=match.keyword).first()
-            embed = discord.Embed(color=COLOR, description=response.content)
-            embed.set_footer(text=f"Confidence: {match.confidence:.01f} ● \N{THUMBS UP SIGN} {response.upvote} \N{THUMBS DOWN SIGN} {response.downvote}")
-            msg = await message.reply(embed=embed)
+        snapshot = await get_guild_snapshot(message.guild.id)
 
-            for reaction in self.reactions:
-                await msg.add_reaction(reaction)
-
-            upvote, downvote = 0, 0
+        # held on to, a keyword change while matching swaps in a fresh cache and keyword map
+        # this result must not land in or be looked up from
+        results, keywords, key = snapshot.results, snapshot.keywords, result_key(text)
+        match = results.get(key, MISSING)
+        if match is MISSING:
             try:
-                react, user = await self.bot.wait_for(
-                    "reaction_add",
-                    check=lambda r, u: r.emoji in self.reactions and u.id == message.author.id and r.message.id == msg.id,
-                    timeout=30,
-                )
-
+                match = await self.matcher.find_match(message.guild.id, snapshot, text)
             except asyncio.TimeoutError:
-                await msg.clear_reactions()
-                return await ResponseData.filter(pk=response.id).update(uses=response.uses + 1)
+                # a slow or busy process pool, not an outcome worth remembering
+                return
 
-            else:
-                if str(react.emoji) == self.reactions[0]:
-                    upvote = 1
+            results[key] = match
+
+        if match is None:
+            return
 
-                elif str(react.emoji) == self.reactions[1]:
-                    downvote = 1
+        response = keywords[match.keyword]
+        embed = discord.Embed(color=COLOR, description=response.content)
+        embed.set_footer(text=f"Confidence: {match.confidence:.01f} ● \N{THUMBS UP SIGN} {response.upvote} \N{THUMBS DOWN SIGN} {response.downvote}")
+        await message.reply(embed=embed, view=ResponseVotes(response.id, message.author.id))
 
-            await msg.clear_reactions()
-            await ResponseData.filter(pk=response.id).update(
-                upvote=response.upvote + upvote, downvote=response.downvote + downvote, uses=response.uses + 1
-            )
+        response.uses += 1
+        self.bot.response_counters.add(response.id, uses=1)
 
     async def welcome_member(self, member: discord.Member) -> None:
         _list = [
@@ -104,17 +109,17 @@ class WhiskeyEvents(commands.Cog):
             await c.send(random.choice(_list).format(member.mention))
 
     async def clean_name(self, member: discord.Member) -> None:
-        _n = normalize("NFKC", member.display_name).encode("ascii", "ignore").decode()
-        _n = re.sub(r"[^a-zA-Z']+", " ", _n)
-
-        _n = "imposter" if _n.lower() == "deadshot" and member.id != DEADSHOT else _n
-
+        key = (member.id, member.display_name)
+        if key in self._clean_names:
+            self._clean_names.move_to_end(key)
+            return
 
-        if _n == member.name:
+        _n = self._clean_names[key] = clean_nickname(member.display_name, member.id)
+        if _n == member.display_name:
             return
 
         with suppress(discord.HTTPException):
-            return await member.edit(nick=_n or "bad_nick")
+            return await member.edit(nick=_n)
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member) -> None:
@@ -128,16 +133,18 @@ class WhiskeyEvents(commands.Cog):
     @commands.Cog.listener(name="on_message")
     async def on_ganda_message(self, message: discord.Message) -> None:
 
-        if message.guild and (message.guild.id != HEAD_GUILD or message.author.bot):
+        if not message.guild or message.guild.id != HEAD_GUILD or message.author.bot:
             return
 
         await self.clean_name(message.author)
 
     @commands.Cog.listener()
-    async def on_guild_member_update(self, before: discord.Member, after: discord.Member) -> None:
+    async def on_member_update(self, before: discord.Member, after: discord.Member) -> None:
         if before.guild.id != HEAD_GUILD:
             return
 
+        self._clean_names.pop((before.id, before.display_name), None)
+
         if before.display_name != after.display_name:
             await self.clean_name(after)
 
@@ -1,22 +1,36 @@
 from __future__ import annotations
 
+import io
 import typing
+from datetime import datetime, timezone
+
+import asyncpg
 from cogs.utils import inputs
 
 if typing.TYPE_CHECKING:
     from bot import Whiskey
 
 from constants import COLOR
-from discord import TextChannel, Member, Role, Embed
+from discord import TextChannel, Member, Role, Embed, File
 from discord.ext import commands
-from models import Response, ResponseData, ArrayAppend, ArrayRemove
+from models import Response, ResponseData, ResponseKeyword, ArrayAppend, ArrayRemove
+from tortoise.exceptions import IntegrityError
+from tortoise.transactions import in_transaction
 from .utils import (
     has_not_done_setup,
     has_done_setup,
     string_input,
     truncate_string,
-    aenumerate,
-    Pages
+    KeysetSource,
+    Pages,
+    guild_configs,
+    guild_snapshots,
+    normalize_keyword,
+    parse_keywords,
+    TRANSFER_FORMATS,
+    dump_responses,
+    load_responses,
+    validate_import,
 )
 
 
@@ -34,11 +48,9 @@ class Responses(commands.Cog):
                 f"You forgot the channels argument, do it like `{ctx.prefix}rsetup #channel1 #channel2 ...`"
             )
 
-        for channel in channels:
-            self.bot.support_channels.add(channel.id)
-
-        query = "INSERT INTO response_info (guild_id,valid_channel_ids,ignored_ids ,allow_all) VALUES ($1, $2, $3,$4)"
-        await self.bot.db.execute(query, ctx.guild.id, [channel.id for channel in channels], [], True)
+        # created through the model, the cached record is what later commands add responses to
+        record = await Response.create(guild_id=ctx.guild.id, valid_channel_ids=[channel.id for channel in channels])
+        self.bot.cache_support_policy(record)
         await ctx.send(f"Auto-response setup successful.\n\nUse `{ctx.prefix}rcreate` to create responses.")
 
     @commands.command()
@@ -50,43 +62,49 @@ class Responses(commands.Cog):
         def check(msg):
             return msg.author == ctx.author and ctx.channel == msg.channel
 
-        record = await Response.get(pk=ctx.guild.id)
-        if not record.all and not ctx.author.guild_permissions.manage_guild:
+        record = await guild_configs.get(ctx.guild.id)
+        if not record.allow_all and not ctx.author.guild_permissions.manage_guild:
             return await ctx.error("You need manage_server permissions to create auto-response. ")
 
         await ctx.send("Enter the auto-response keywords. Separate them with a comma`(,)`.")
-        keywords = await string_input(ctx, check)
-
-        keywords = keywords.strip().split(",")
-        keywords = [k.strip() for k in keywords if not len(k) >= 100]
+        keywords = parse_keywords(await string_input(ctx, check))
+        if not keywords:
+            return await ctx.send("You didn't enter any keyword.")
 
-        cmds = [cmd.qualified_name for cmd in self.bot.walk_commands()]
+        if taken := await ResponseKeyword.taken(ctx.guild.id, keywords):
+            return await ctx.send(f"There is already a keyword with name `{keywords[taken[0]]}`")
 
-        for keyword in keywords:
-            if bool(await record.data.filter(keywords__icontains=keyword)):
-                return await ctx.send(f"There is already a keyword with name `{keyword}`")
-
-            if keyword in cmds:
+        for normalized, keyword in keywords.items():
+            if normalized in self.bot.reserved_names:
                 return await ctx.send(f"`{keyword}` is a reserved keyword.")
 
         await ctx.send("What should be the response for those keywords?")
         response = await string_input(ctx, check, timeout=300)
         response = truncate_string(response, 3080)
 
-        res = await ResponseData.create(keywords=keywords, content=response, author_id=ctx.author.id)
-        await record.data.add(res)
-        return await ctx.send(
-            "Response was created successfully." f"\n\nIt can take upto a minute to show that response."
-        )
+        try:
+            async with in_transaction():
+                res = await ResponseData.create(
+                    keywords=list(keywords.values()), content=response, author_id=ctx.author.id
+                )
+                await record.data.add(res)
+                await ResponseKeyword.replace(ctx.guild.id, res.id, keywords)
+        except IntegrityError:
+            return await ctx.send("One of those keywords was just taken by another response, try again.")
+
+        guild_snapshots.put(ctx.guild.id, res, keywords)
+        return await ctx.send("Response was created successfully.")
 
     @commands.command()
     @commands.has_permissions(manage_guild=True)
     @has_done_setup()
     async def rperm(self, ctx: commands.Context) -> None:
         """allow/deny everyone to create responses"""
-        record = await Response.get(pk=ctx.guild.id)
+        record = await guild_configs.get(ctx.guild.id)
         await Response.filter(pk=ctx.guild.id).update(allow_all=not record.allow_all)
-        if not record.allow_all:
+        record.allow_all = not record.allow_all
+        self.bot.cache_support_policy(record)
+        if record.allow_all:
             return await ctx.send("Now anyone can create auto-responses")
 
         return await ctx.send("From now on, people need manage_server permissions to create auto responses")
@@ -95,14 +113,15 @@ class Responses(commands.Cog):
     @has_done_setup()
     async def rlist(self, ctx: commands.Context) -> None:
         """list of all response this server has"""
-        main_record = await Response.get(pk=ctx.guild.id)
+        main_record = await guild_configs.get(ctx.guild.id)
 
-        _list = []
-        async for idx, record in aenumerate(main_record.data.all().order_by("id")):
-            keywords = ", ".join(record.keywords)
-            _list.append(f"`{idx:02}` {truncate_string(keywords, 50)} (ID: {record.id})\n")
+        def format_entry(idx: int, record: ResponseData) -> str:
+            return f"`{idx:02}` {truncate_string(', '.join(record.keywords), 50)} (ID: {record.id})\n"
+
+        source = KeysetSource(main_record.data.all().only("id", "keywords"), per_page=10, format_entry=format_entry)
+        total = await source.prepare()
 
-        paginator = Pages(ctx, title=f"Total Response: {len(_list)}", entries=_list, per_page=10, show_entry_count=True)
+        paginator = Pages(ctx, title=f"Total Response: {total}", source=source, show_entry_count=True)
         await paginator.paginate()
 
     @commands.command()
@@ -110,12 +129,13 @@ class Responses(commands.Cog):
     @has_done_setup()
     async def rdelete(self, ctx: commands.Context, response_id: int)-> None:
         """delete a smart response"""
-        main_record = await Response.get(pk=ctx.guild.id)
+        main_record = await guild_configs.get(ctx.guild.id)
         res = await main_record.data.filter(pk=response_id).first()
         if not res:
             return await ctx.send("response id is invalid")
 
         await ResponseData.filter(pk=res.id).delete()
+        guild_snapshots.remove(ctx.guild.id, res.id)
         await ctx.send("done")
 
     @commands.command()
@@ -123,7 +143,7 @@ class Responses(commands.Cog):
     @has_done_setup()
     async def rstats(self, ctx: commands.Context, response_id: int)-> None:
         """stats of a response"""
-        main_record = await Response.get(pk=ctx.guild.id)
+        main_record = await guild_configs.get(ctx.guild.id)
         res = await main_record.data.filter(pk=response_id).first()
         if not res:
             return await ctx.send("response id is invalid")
@@ -142,14 +162,16 @@ class Responses(commands.Cog):
     async def rchannel(self, ctx: commands.Context, *, channel: TextChannel) -> None:
         """add or remove a channel to valid support channels"""
 
-        record = await Response.get(pk=ctx.guild.id)
+        record = await guild_configs.get(ctx.guild.id)
         func = (ArrayAppend, ArrayRemove)[channel.id in record.valid_channel_ids]
         await Response.filter(pk=ctx.guild.id).update(valid_channel_ids=func("valid_channel_ids", channel.id))
         if channel.id in record.valid_channel_ids:
-            self.bot.support_channels.discard(channel.id)
+            record.valid_channel_ids.remove(channel.id)
+            self.bot.cache_support_policy(record)
             return await ctx.send(f"{channel.mention} is no longer a response channel.")
 
-        self.bot.support_channels.add(channel.id)
+        record.valid_channel_ids.append(channel.id)
+        self.bot.cache_support_policy(record)
         return await ctx.send(f"{channel.mention} added to response channel.")
 
     @commands.command()
@@ -159,12 +181,16 @@ class Responses(commands.Cog):
         """ignore a member or role in support channel"""
         id = member_or_role.id
 
-        record = await Response.get(pk=ctx.guild.id)
+        record = await guild_configs.get(ctx.guild.id)
         func = (ArrayAppend, ArrayRemove)[id in record.ignored_ids]
         await Response.filter(pk=ctx.guild.id).update(ignored_ids=func("ignored_ids", id))
         if id in record.ignored_ids:
+            record.ignored_ids.remove(id)
+            self.bot.cache_support_policy(record)
             return await ctx.send(f"{member_or_role.mention} is no longer ignored")
 
+        record.ignored_ids.append(id)
+        self.bot.cache_support_policy(record)
         return await ctx.send(f"{member_or_role.mention} will be ignored")
 
     @commands.command()
@@ -173,7 +199,7 @@ class Responses(commands.Cog):
     async def rconfig(self, ctx: commands.Context) -> None:
         """Get current server's smart response config"""
 
-        record = await Response.get(pk=ctx.guild.id)
+        record = await guild_configs.get(ctx.guild.id)
 
         _list = []
         for idx in record.ignored_ids:
@@ -194,7 +220,7 @@ class Responses(commands.Cog):
     @has_done_setup()
     async def redit(self, ctx: commands.Context, response_id: int, option: str = None)-> None:
         """edit a response content or keywords"""
-        main_record = await Response.get(pk=ctx.guild.id)
+        main_record = await guild_configs.get(ctx.guild.id)
         res = await main_record.data.filter(pk=response_id).first()
         if not res:
             return await ctx.send("response id is invalid")
@@ -210,25 +236,30 @@ class Responses(commands.Cog):
                 f"please enter the new keywords to append or remove from id:{response_id}, separate them with comman(,)"
             )
 
-            keywords = await string_input(ctx, check=check)
-
-            keywords = keywords.strip().split(",")
-            keywords = [k.strip() for k in keywords if not len(k) >= 100]
-
-            cmds = [cmd.qualified_name for cmd in self.bot.walk_commands()]
-
-            valid_keywords = set()
-
-            for keyword in keywords:
-                if not bool(await main_record.data.filter(keywords__icontains=keyword)) and not keyword in cmds:
-                    if keyword in res.keywords[:]:
-                        res.remove(keyword)
-                    else:
-                        valid_keywords.add(keyword)
-
-            valid_keywords.update(set(res.keywords))
-            query = "UPDATE response_data SET keywords = $1 WHERE id = $2"
-            await self.bot.db.execute(query, valid_keywords, res.id)
+            keywords = parse_keywords(await string_input(ctx, check=check))
+
+            current = {}
+            for keyword in res.keywords:
+                current.setdefault(normalize_keyword(keyword), keyword)
+
+            # a keyword the response already has is removed, a new one is added if it's free
+            taken = set(await ResponseKeyword.taken(ctx.guild.id, {*keywords, *current}, exclude=res.id))
+            for normalized, keyword in keywords.items():
+                if normalized in current:
+                    del current[normalized]
+                elif normalized not in taken and normalized not in self.bot.reserved_names:
+                    current[normalized] = keyword
+
+            res.keywords = list(current.values())
+            owned = {k: v for k, v in current.items() if k not in taken}
+            try:
+                async with in_transaction():
+                    await res.save(update_fields=["keywords"])
+                    await ResponseKeyword.replace(ctx.guild.id, res.id, owned)
+            except IntegrityError:
+                return await ctx.send("One of those keywords was just taken by another response, try again.")
+
+            guild_snapshots.put(ctx.guild.id, res, owned)
             await ctx.send("keywords updated.")
             return
 
@@ -237,8 +268,88 @@ class Responses(commands.Cog):
         content = await string_input(ctx, check=check, timeout=300)
         content = truncate_string(content, 3080)
         await self.bot.db.execute("UPDATE response_data SET content = $1 WHERE id = $2", content, res.id)
+        res.content = content
+        guild_snapshots.put(ctx.guild.id, res)
         await ctx.send("content updated.")
 
+    @commands.command()
+    @commands.has_permissions(manage_guild=True)
+    @has_done_setup()
+    @commands.bot_has_permissions(attach_files=True)
+    async def rexport(self, ctx: commands.Context, fmt: str = "json") -> None:
+        """export this server's responses as a json or csv file"""
+        fmt = fmt.lower()
+        if fmt not in TRANSFER_FORMATS:
+            return await ctx.send("The format can be `json` or `csv`.")
+
+        query = """SELECT d.id, d.keywords, d.content, d.uses, d.upvote, d.downvote, d.author_id, d.created_at
+            FROM response_data AS d JOIN response_info_response_data AS l ON l.responsedata_id = d.id
+            WHERE l.response_info_id = $1 ORDER BY d.id"""
+        rows = [dict(row) for row in await self.bot.db.fetch(query, ctx.guild.id)]
+
+        file = File(io.BytesIO(dump_responses(rows, fmt)), filename=f"responses-{ctx.guild.id}.{fmt}")
+        await ctx.send(f"Exported {len(rows)} responses.", file=file)
+
+    @commands.command()
+    @commands.has_permissions(manage_guild=True)
+    @has_done_setup()
+    async def rimport(self, ctx: commands.Context) -> None:
+        """import responses from a json or csv file, like the one rexport gives"""
+        attachment = ctx.message.attachments[0] if ctx.message.attachments else None
+        fmt = attachment.filename.rsplit(".", 1)[-1].lower() if attachment else None
+        if fmt not in TRANSFER_FORMATS:
+            return await ctx.send(f"Attach a `.json` or `.csv` file to `{ctx.prefix}rimport`.")
+
+        if attachment.size > 4 * 1024 * 1024:
+            return await ctx.send("That file is too large, split it up.")
+
+        responses = load_responses(await attachment.read(), fmt)
+
+        # validated in memory, only rows that can be written reach the database
+        query = "SELECT keyword_normalized FROM response_keyword WHERE guild_id = $1"
+        taken = {row["keyword_normalized"] for row in await self.bot.db.fetch(query, ctx.guild.id)}
+        valid, skipped = validate_import(responses, taken, self.bot.reserved_names)
+        if not valid:
+            return await ctx.send(f"Nothing to import. ({', '.join(skipped[:5]) or 'the file is empty'})")
+
+        now = datetime.now(timezone.utc)
+        try:
+            async with self.bot.db.acquire() as connection, connection.transaction():
+                query = "SELECT nextval(pg_get_serial_sequence('response_data', 'id')) FROM generate_series(1, $1)"
+                ids = [row[0] for row in await connection.fetch(query, len(valid))]
+
+                await connection.copy_records_to_table(
+                    "response_data",
+                    records=[
+                        (response_id, list(res.keywords.values()), res.content, 0, 0, 0, ctx.author.id, now)
+                        for response_id, res in zip(ids, valid)
+                    ],
+                    columns=("id", "keywords", "content", "uses", "upvote", "downvote", "author_id", "created_at"),
+                )
+                await connection.copy_records_to_table(
+                    "response_info_response_data",
+                    records=[(ctx.guild.id, response_id) for response_id in ids],
+                    columns=("response_info_id", "responsedata_id"),
+                )
+                await connection.copy_records_to_table(
+                    "response_keyword",
+                    records=[
+                        (ctx.guild.id, keyword, normalized, response_id)
+                        for response_id, res in zip(ids, valid)
+                        for normalized, keyword in res.keywords.items()
+                    ],
+                    columns=("guild_id", "keyword", "keyword_normalized", "response_id"),
+                )
+        except asyncpg.UniqueViolationError:
+            return await ctx.send("Some of those keywords were just taken by another response, try again.")
+
+        guild_snapshots.invalidate(ctx.guild.id)
+
+        message = f"Imported {len(valid)} responses."
+        if skipped:
+            message += f"\nSkipped {len(skipped)}: {truncate_string(', '.join(skipped), 1500)}"
+        await ctx.send(message)
+
 
 async def setup(bot):
     await bot.add_cog(Responses(bot))
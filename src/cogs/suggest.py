@@ -3,8 +3,9 @@ import contextlib
 import io
 from itertools import zip_longest
 
-from typing import TYPE_CHECKING, Any, Optional, Dict, Union, List
-from .utils import TabularData, WrappedMessageConverter
+from typing import TYPE_CHECKING, Any, Optional, Dict, Union, List, Set, Tuple
+from .utils import LRUCache, SuggestionVotes, TabularData, WrappedMessageConverter
+from models import Suggestion
 
 if TYPE_CHECKING:
     from bot import Whiskey
@@ -42,62 +43,113 @@ OTHER_REACTION = {
 }
 
 
+def flag_content(status: Optional[str]) -> Optional[str]:
+    """the suggestion message's content for a flag"""
+    if status is None:
+        return None
+
+    return f"Flagged: {status} | {OTHER_REACTION[status]['emoji']}"
+
+
 class Suggest(commands.Cog):
     def __init__(self, bot: Whiskey) -> None:
         self.bot = bot
 
-        self.suggested_messages_id: Dict[int, Message] = {}
+        # the suggestions seen recently, by message id
+        self.suggestions: LRUCache[int, Suggestion] = LRUCache(1024)
+        self.votes = SuggestionVotes(bot)
         self.suggestion_channel = None
         self.cooldown = commands.CooldownMapping.from_cooldown(
             1, 60, commands.BucketType.member
         )
 
+    async def cog_load(self) -> None:
+        self.votes.start()
+
+    async def cog_unload(self) -> None:
+        await self.votes.close()
+
     def cog_check(self, ctx):
         return ctx.guild is not None and ctx.guild.id == 746337818388987967
 
-    async def get_or_fetch_message(
-        self, message_id: int, *, from_cache: bool=True, force_fetch: bool=False,
-    ) -> Optional[Message]:
-
-        if from_cache:
-            cached_message = self.bot._connection._messages
-            for msg in cached_message:
-                # looping over deque is O(n)
-                # I don't think the method is slow *thinks*
-                # since the suggestion is now very frequent,
-                # so it's ok for now
-                if msg.id == message_id:
-                    self.suggested_messages_id[message_id] = msg
-                    return msg
-
-        if force_fetch and self.suggestion_channel is None:
-            self.suggestion_channel = await self._fetch_channel()
+    async def get_suggestion(self, message_id: int) -> Optional[Suggestion]:
+        """the suggestion's row, a suggestion posted before there was one is read from its message once"""
+        try:
+            return self.suggestions[message_id]
+        except KeyError:
+            pass
 
-            await self.bot.wait_until_ready()
+        suggestion = await Suggestion.get_or_none(message_id=message_id)
+        if suggestion is None:
+            suggestion = await self._import_suggestion(message_id)
 
-            msg: Message = await self.suggestion_channel.fetch_message(
-                message_id
-            )
-            self.suggested_messages_id[message_id] = msg
-            return msg
+        if suggestion is not None:
+            self.suggestions[message_id] = suggestion
+
+        return suggestion
+
+    async def _import_suggestion(self, message_id: int) -> Optional[Suggestion]:
+        if self.suggestion_channel is None:
+            self.suggestion_channel = await self._fetch_channel(SUGGESTION_CHANNEL_ID)
 
         try:
-            self.suggested_messages_id[message_id]
-        except KeyError:
-            if self.suggestion_channel is None:
-                self.suggestion_channel = await self._fetch_channel(SUGGESTION_CHANNEL_ID)
+            msg: Message = await self.suggestion_channel.fetch_message(message_id)
+        except discord.HTTPException:
+            return None
 
-            await self.bot.wait_until_ready()
+        if msg.author.id != self.bot.user.id or not msg.embeds:
+            return None
+
+        embed = msg.embeds[0]
+        try:
+            author_id = int(embed.footer.text.split(":")[1])
+        except (IndexError, TypeError, ValueError):
+            return None
+
+        votes = {str(reaction.emoji): reaction.count - reaction.me for reaction in msg.reactions}
+        flags = [i["emoji"] for i in OTHER_REACTION.values() if i["emoji"] in votes]
+        status = next((i for i in OTHER_REACTION if flag_content(i) == msg.content), None)
+        remark = next((field.value for field in embed.fields if field.name == "Remark"), None)
+
+        suggestion, _ = await Suggestion.get_or_create(
+            message_id=msg.id,
+            defaults=dict(
+                author_id=author_id,
+                content=embed.description or "",
+                status=status,
+                remark=remark,
+                upvotes=votes.get(REACTION_EMOJI[0], 0),
+                downvotes=votes.get(REACTION_EMOJI[1], 0),
+                embed=embed.to_dict(),
+                flags=flags,
+            ),
+        )
+        return suggestion
+
+    async def edit_suggestion(self, suggestion: Suggestion, embed: discord.Embed, *fields: str) -> discord.PartialMessage:
+        """edit the suggestion's message to match its row, without fetching it, then save the changed fields"""
+        if self.suggestion_channel is None:
+            self.suggestion_channel = await self._fetch_channel(SUGGESTION_CHANNEL_ID)
 
-            async for msg in self.suggestion_channel.history(
-                limit=1,
-                before=discord.Object(message_id + 1),
-                after=discord.Object(message_id - 1),
-            ):
-                self.suggested_messages_id[msg.id] = msg
-                return msg
-        else:
-            return self.suggested_messages_id[message_id]
+        suggestion.embed = embed.to_dict()
+        msg = self.suggestion_channel.get_partial_message(suggestion.message_id)
+        await msg.edit(content=flag_content(suggestion.status), embed=embed)
+        await suggestion.save(update_fields=["embed", *fields])
+        return msg
+
+    async def reconcile_votes(self, suggestion: Suggestion) -> Optional[Tuple[Set[int], Set[int]]]:
+        """page through the suggestion's arrow reactions, the only time its voters are fetched"""
+        if self.suggestion_channel is None:
+            self.suggestion_channel = await self._fetch_channel(SUGGESTION_CHANNEL_ID)
+
+        try:
+            msg: Message = await self.suggestion_channel.fetch_message(suggestion.message_id)
+        except discord.NotFound:
+            return None
+
+        votes = await self.votes.reconcile(msg, tuple(REACTION_EMOJI))
+        suggestion.upvotes, suggestion.downvotes = len(votes[0]), len(votes[1])
+        return votes
 
     async def _fetch_channel(self, channel_id: Optional[int]=None) -> Optional[TextChannel]:
         channel_id: int = channel_id or SUGGESTION_CHANNEL_ID
@@ -114,7 +166,10 @@ class Suggest(commands.Cog):
         if self.suggestion_channel is None:
             self.suggestion_channel = await self._fetch_channel(SUGGESTION_CHANNEL_ID)
         msg: Optional[Message] = await self.suggestion_channel.send(content, embed=embed, file=file)
-        self.suggested_messages_id[msg.id] = msg
+        # the sent embed, an attached image's url is only known now
+        self.suggestions[msg.id] = await Suggestion.create(
+            message_id=msg.id, author_id=ctx.author.id, content=embed.description, embed=msg.embeds[0].to_dict()
+        )
         await self.__add_bulk_reaction(msg, *REACTION_EMOJI)
         await msg.create_thread(name=f"Suggestion {ctx.author}")
         return msg
@@ -186,26 +241,17 @@ class Suggest(commands.Cog):
     async def suggest_delete(self, ctx: commands.Context, *, messageID: int):
         """To delete the suggestion you suggested"""
 
-        msg: Optional[Message] = await self.get_or_fetch_message(messageID)
-        if not msg:
+        suggestion: Optional[Suggestion] = await self.get_suggestion(messageID)
+        if not suggestion:
             return await ctx.send(
                 f"Can not find message of ID `{messageID}`. Probably already deleted, or `{messageID}` is invalid"
             )
 
-        if msg.author.id != self.bot.user.id:
-            return await ctx.send(
-                f"Invalid `{messageID}`"
-            )
-
-        if ctx.channel.permissions_for(ctx.author).manage_messages:
-            await msg.delete(delay=0)
-            await ctx.send("Done", delete_after=5)
-            return
-
-        if int(msg.embeds[0].footer.text.split(":")[1]) != ctx.author.id:
+        if not ctx.channel.permissions_for(ctx.author).manage_messages and suggestion.author_id != ctx.author.id:
             return await ctx.send(f"You don't own that 'suggestion'")
 
-        await msg.delete(delay=0)
+        # the row goes with it, in suggest_msg_delete
+        await self.suggestion_channel.get_partial_message(suggestion.message_id).delete(delay=0)
         await ctx.send("Done", delete_after=5)
 
 
@@ -214,70 +260,75 @@ class Suggest(commands.Cog):
     async def suggest_status(self, ctx: commands.Context, *, messageID: int):
         """To get the statistics os the suggestion"""
 
-        msg: Optional[Message] = await self.get_or_fetch_message(messageID, force_fetch=True)
-        if not msg:
+        suggestion: Optional[Suggestion] = await self.get_suggestion(messageID)
+        if not suggestion:
             return await ctx.send(
                 f"Can not find message of ID `{messageID}`. Probably already deleted, or `{messageID}` is invalid"
             )
-        
-        if msg.author.id != self.bot.user.id:
-            return await ctx.send(
-                f"Invalid `{messageID}`"
-            )
-        
-        table = TabularData()
 
-        upvoter = []
-        downvoter = []
-        # to prevent `refrence-error`
-        # we are sure there always exists 2 reaction
-        # but, python is not smart as we UwU
-
-        for reaction in msg.reactions:
-            if str(reaction.emoji) == "\N{UPWARDS BLACK ARROW}":
-                upvoter = await reaction.users().flatten()
-            elif str(reaction.emoji) == "\N{DOWNWARDS BLACK ARROW}":
-                downvoter = await reaction.users().flatten()
-        upvoter = [str(m) for m in upvoter]
-        downvoter = [str(m) for m in downvoter]
-        
+        votes = await self.votes.load(suggestion.message_id)
+        if votes is None:
+            votes = await self.reconcile_votes(suggestion)
+            if votes is None:
+                return await ctx.send(f"Can not find message of ID `{messageID}`. Probably already deleted")
+
+        def name(user_id: int) -> str:
+            member = ctx.guild.get_member(user_id)
+            return str(member) if member is not None else str(user_id)
+
+        upvoter = [name(user_id) for user_id in sorted(votes[0])]
+        downvoter = [name(user_id) for user_id in sorted(votes[1])]
+
+        table = TabularData()
         table.set_columns(["Upvote", "Downvote"])
         ls = list(zip_longest(upvoter, downvoter, fillvalue=''))
         table.add_rows(ls)
 
-        conflict = [i for i in upvoter if i in downvoter]
+        conflict = [name(user_id) for user_id in sorted(votes[0] & votes[1])]
 
         embed = discord.Embed()
         embed.description = f"```\n{table.render()}```"
         if conflict:
-            embed.add_field(name=f"Conflit in Reaction: {len(conflict)}", value=", ".join([str(i) for i in conflict]))
-        if msg.content:
-            embed.add_field(name="Flagged", value=msg.content)
-        await ctx.send(content=msg.jump_url, embed=embed)
+            embed.add_field(name=f"Conflit in Reaction: {len(conflict)}", value=", ".join(conflict))
+        if suggestion.status:
+            embed.add_field(name="Flagged", value=flag_content(suggestion.status))
+        await ctx.send(content=self.suggestion_channel.get_partial_message(suggestion.message_id).jump_url, embed=embed)
+
+
+    @suggest.command(name="reconcile", aliases=["sync"])
+    @commands.check_any(commands.has_permissions(manage_messages=True), commands.has_any_role(874328457167929386, 'Moderator'))
+    async def suggest_reconcile(self, ctx: commands.Context, messageID: int):
+        """To recount the votes of a suggestion from its reactions"""
+        suggestion: Optional[Suggestion] = await self.get_suggestion(messageID)
+        if not suggestion:
+            return await ctx.send(
+                f"Can not find message of ID `{messageID}`. Probably already deleted, or `{messageID}` is invalid"
+            )
+
+        votes = await self.reconcile_votes(suggestion)
+        if votes is None:
+            return await ctx.send(f"Can not find message of ID `{messageID}`. Probably already deleted")
+
+        await ctx.send(f"Done, {len(votes[0])} upvotes and {len(votes[1])} downvotes", delete_after=5)
 
 
     @suggest.command(name="note", aliases=["remark"])
     @commands.check_any(commands.has_permissions(manage_messages=True), commands.has_any_role(874328457167929386, 'Moderator'))
     async def add_note(self, ctx: commands.Context, messageID: int, *, remark: str):
         """To add a note in suggestion embed"""
-        msg: Optional[Message] = await self.get_or_fetch_message(messageID)
-        if not msg:
+        suggestion: Optional[Suggestion] = await self.get_suggestion(messageID)
+        if not suggestion:
             return await ctx.send(
                 f"Can not find message of ID `{messageID}`. Probably already deleted, or `{messageID}` is invalid"
             )
         
-        if msg.author.id != self.bot.user.id:
-            return await ctx.send(
-                f"Invalid `{messageID}`"
-            )
-        
-        embed: discord.Embed = msg.embeds[0]
+        embed = discord.Embed.from_dict(suggestion.embed)
         embed.clear_fields()
         embed.add_field(name="Remark", value=remark[:250])
-        await msg.edit(content=msg.content, embed=embed)
+        suggestion.remark = remark[:250]
+        msg = await self.edit_suggestion(suggestion, embed, "remark")
 
-        user_id = int(embed.footer.text.split(":")[1])
-        user = ctx.guild.get_member(user_id)
+        user = ctx.guild.get_member(suggestion.author_id)
         await self.__notify_user(ctx, user, message=msg, remark=remark)
 
         await ctx.send("Done", delete_after=5)
@@ -287,25 +338,21 @@ class Suggest(commands.Cog):
     @commands.check_any(commands.has_permissions(manage_messages=True), commands.has_any_role(874328457167929386, 'Moderator'))
     async def clear_suggestion_embed(self, ctx: commands.Context, messageID: int,):
         """To remove all kind of notes and extra reaction from suggestion embed"""
-        msg: Optional[Message] = await self.get_or_fetch_message(messageID)
-        if not msg:
+        suggestion: Optional[Suggestion] = await self.get_suggestion(messageID)
+        if not suggestion:
             return await ctx.send(
                 f"Can not find message of ID `{messageID}`. Probably already deleted, or `{messageID}` is invalid"
             )
         
-        if msg.author.id != self.bot.user.id:
-            return await ctx.send(
-                f"Invalid `{messageID}`"
-            )
-        
-        embed: discord.Embed = msg.embeds[0]
+        embed = discord.Embed.from_dict(suggestion.embed)
         embed.clear_fields()
         embed.color = 0xADD8E6
-        await msg.edit(embed=embed, content=None)
+        flags, suggestion.flags = suggestion.flags, []
+        suggestion.status = suggestion.remark = None
+        msg = await self.edit_suggestion(suggestion, embed, "status", "remark", "flags")
 
-        for reaction in msg.reactions:
-            if str(reaction.emoji) not in REACTION_EMOJI:
-                await msg.clear_reaction(reaction.emoji)
+        for emoji in flags:
+            await msg.clear_reaction(emoji)
 
         await ctx.send("Done", delete_after=5)
 
@@ -324,32 +371,26 @@ class Suggest(commands.Cog):
         """
         flag = flag or "INVALID"
 
-        msg: Optional[Message] = await self.get_or_fetch_message(messageID)
-        if not msg:
+        suggestion: Optional[Suggestion] = await self.get_suggestion(messageID)
+        if not suggestion:
             return await ctx.send(
                 f"Can not find message of ID `{messageID}`. Probably already deleted, or `{messageID}` is invalid"
             )
         
-        if msg.author.id != self.bot.user.id:
-            return await ctx.send(
-                f"Invalid `{messageID}`"
-            )
-        
         flag = flag.upper()
         try:
             payload: Dict[str, Union[int, str]] = OTHER_REACTION[flag]
         except KeyError:
             return await ctx.send("Invalid Flag")
 
-        embed: discord.Embed = msg.embeds[0]
+        embed = discord.Embed.from_dict(suggestion.embed)
         embed.color = payload["color"]
 
-        user_id = int(embed.footer.text.split(":")[1])
-        user: Member = ctx.guild.get_member(user_id)
-        await self.__notify_user(ctx, user, message=msg, remark="")
+        suggestion.status = flag
+        msg = await self.edit_suggestion(suggestion, embed, "status")
 
-        content = f"Flagged: {flag} | {payload['emoji']}"
-        await msg.edit(content=content, embed=embed)
+        user: Member = ctx.guild.get_member(suggestion.author_id)
+        await self.__notify_user(ctx, user, message=msg, remark="")
         await ctx.send("Done", delete_after=5)
 
 
@@ -361,8 +402,11 @@ class Suggest(commands.Cog):
         if self.suggestion_channel.id != payload.channel_id:
             return
 
-        if payload.message_id in self.suggested_messages_id:
-            del self.suggested_messages_id[payload.message_id]
+        self.suggestions.pop(payload.message_id, None)
+        self.votes.forget(payload.message_id)
+        # the suggest command deletes every message it turns into a suggestion
+        if payload.cached_message is None or payload.cached_message.author.id == self.bot.user.id:
+            await Suggestion.filter(message_id=payload.message_id).delete()
 
 
     @commands.Cog.listener(name="on_raw_reaction_add")
@@ -372,7 +416,12 @@ class Suggest(commands.Cog):
         
         if self.suggestion_channel.id != payload.channel_id:
             return
-        
+
+        if str(payload.emoji) in REACTION_EMOJI:
+            if payload.user_id != self.bot.user.id:
+                self.votes.add(payload.message_id, payload.user_id, str(payload.emoji) == REACTION_EMOJI[0])
+            return
+
         # not adding extra `is-mod` check, cause only mods can
         # react on that channel (discord internal permission management)
 
@@ -381,19 +430,46 @@ class Suggest(commands.Cog):
             # to get the emoji from nested dict into dict
             # Dict[str, Dict[str, Any]]
             if str(payload.emoji) == OTHER_REACTION[i]["emoji"]:
-                msg: Optional[Message] = await self.get_or_fetch_message(payload.message_id)
+                suggestion: Optional[Suggestion] = await self.get_suggestion(payload.message_id)
 
-                if not msg:
+                if not suggestion:
                     return
 
-                if msg.author.id != self.bot.user.id:
-                    return
+                if OTHER_REACTION[i]["emoji"] not in suggestion.flags:
+                    suggestion.flags = [*suggestion.flags, OTHER_REACTION[i]["emoji"]]
 
-                embed: discord.Embed = msg.embeds[0]
+                embed = discord.Embed.from_dict(suggestion.embed)
                 embed.color = OTHER_REACTION[i]["color"]
-                content = f"Flagged: {i} | {OTHER_REACTION[i]['emoji']}"
-                
-                return await msg.edit(content=content, embed=embed)
+                suggestion.status = i
+
+                await self.edit_suggestion(suggestion, embed, "status", "flags")
+                return
+
+
+    @commands.Cog.listener(name="on_raw_reaction_remove")
+    async def suggest_msg_unreact(self, payload: discord.RawReactionActionEvent):
+        if self.suggestion_channel is None:
+            self.suggestion_channel = await self._fetch_channel()
+
+        if self.suggestion_channel.id != payload.channel_id:
+            return
+
+        if str(payload.emoji) in REACTION_EMOJI and payload.user_id != self.bot.user.id:
+            self.votes.remove(payload.message_id, payload.user_id, str(payload.emoji) == REACTION_EMOJI[0])
+
+
+    @commands.Cog.listener(name="on_raw_reaction_clear")
+    async def suggest_msg_clear(self, payload: discord.RawReactionClearEvent):
+        if self.suggestion_channel is not None and self.suggestion_channel.id == payload.channel_id:
+            # recounted from the message the next time they're needed
+            self.votes.forget(payload.message_id)
+
+
+    @commands.Cog.listener(name="on_raw_reaction_clear_emoji")
+    async def suggest_msg_clear_emoji(self, payload: discord.RawReactionClearEmojiEvent):
+        if self.suggestion_channel is not None and self.suggestion_channel.id == payload.channel_id:
+            if str(payload.emoji) in REACTION_EMOJI:
+                self.votes.forget(payload.message_id)
 
 
     @commands.Cog.listener()
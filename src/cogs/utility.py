@@ -10,12 +10,14 @@ if typing.TYPE_CHECKING:
 
 import re
 import io
+import asyncio
 import os
 import zlib
 import discord
 
 from .views import SelfRoles
-from .utils import fuzzy
+from .utils import NicknameCleaner, fuzzy
+from contextlib import suppress
 
 from discord.ext import commands
 
@@ -60,6 +62,11 @@ class Utility(commands.Cog):
     def __init__(self, bot: Whiskey):
         self.bot = bot
         self._rtfm_cache: typing.Dict[str, typing.Any] = {}
+        self._nickclean_jobs: typing.Dict[int, NicknameCleaner] = {}
+
+    async def cog_unload(self) -> None:
+        for job in self._nickclean_jobs.values():
+            job.cancel()
 
     def parse_object_inv(self, stream, url):
         # key: URL
@@ -262,16 +269,52 @@ class Utility(commands.Cog):
         await ctx.message.delete(delay=0)
         await ctx.send(embed=embed, view=SelfRoles())
 
-    # @commands.command()
-    # @commands.has_permissions(manage_nicknames=True)
-    # @commands.bot_has_guild_permissions(manage_nicknames=True)
-    # async def nickclean(self, ctx: commands.Context):
-    #     """Clean every member's nickname, excluding bots"""
-    #     for m in ctx.guild.members:
-    #         if m.bot:
-    #             continue
-
-    #         ...
+    async def run_nickclean(self, ctx: commands.Context, job: NicknameCleaner) -> None:
+        if not ctx.guild.chunked:
+            await ctx.guild.chunk()
+
+        self._nickclean_jobs[ctx.guild.id] = job
+        task = job.start()
+        message = await ctx.send(job.progress)
+        while not task.done():
+            await asyncio.wait({task}, timeout=10)
+            with suppress(discord.HTTPException):
+                await message.edit(content=job.progress)
+
+        task.result()
+
+    @commands.group(invoke_without_command=True)
+    @commands.has_permissions(manage_nicknames=True)
+    @commands.bot_has_guild_permissions(manage_nicknames=True)
+    async def nickclean(self, ctx: commands.Context):
+        """Clean every member's nickname, excluding bots"""
+        job = self._nickclean_jobs.get(ctx.guild.id)
+        if job is not None and not job.done:
+            return await ctx.send(job.progress)
+
+        await self.run_nickclean(ctx, NicknameCleaner(ctx.guild))
+
+    @nickclean.command(name="cancel")
+    @commands.has_permissions(manage_nicknames=True)
+    async def nickclean_cancel(self, ctx: commands.Context):
+        """Stop the running nickname cleanup, it can be resumed later"""
+        job = self._nickclean_jobs.get(ctx.guild.id)
+        if job is None or job.done:
+            return await ctx.send("There is no nickname cleanup running.")
+
+        job.cancel()
+        await ctx.send("Cancelling, the edits already in flight will finish.")
+
+    @nickclean.command(name="resume")
+    @commands.has_permissions(manage_nicknames=True)
+    @commands.bot_has_guild_permissions(manage_nicknames=True)
+    async def nickclean_resume(self, ctx: commands.Context):
+        """Continue a cancelled nickname cleanup from where it stopped"""
+        job = self._nickclean_jobs.get(ctx.guild.id)
+        if job is None or not job.done or not job.cancelled:
+            return await ctx.send("There is no cancelled nickname cleanup to resume.")
+
+        await self.run_nickclean(ctx, job.resume())
 
     @commands.command()
     async def addbot(self, ctx: commands.Context, clientID: int, *, reason: str = None):
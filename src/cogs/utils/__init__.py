@@ -1,8 +1,12 @@
 from .cache import *
+from .counters import *
 from .decorators import *
 from .inputs import *
 from .formats import *
 from .defaults import *
 from .paginator import *
 from .help import *
-from .converters import *
\ No newline at end of file
+from .converters import *
+from .transfer import *
+from .nicknames import *
+
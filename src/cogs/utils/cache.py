@@ -1,15 +1,223 @@
-from aiocache import cached
-from models import Response
-from aiocache.serializers import PickleSerializer
+from __future__ import annotations
 
+import asyncio
 import itertools
+from collections import OrderedDict
+from functools import partial
+from typing import Dict, Iterable, List, Optional
 
+from discord.utils import MISSING
+from models import Response, ResponseData, ResponseKeyword
 
-@cached(ttl=60, serializer=PickleSerializer())
-async def get_guild_keywords(guild_id: int):
-    records = await Response.get(guild_id=guild_id)
-    _list = []
-    async for record in records.data.all():
-        _list.append(record.keywords)
+from constants import MATCH_ENGINE
+from .defaults import MATCH_ENGINES, Match, normalize_keyword, window_sizes
 
-    return list(itertools.chain(*_list))
+
+class LRUCache(OrderedDict):
+    """An OrderedDict that forgets its least recently used keys past ``maxsize``"""
+
+    def __init__(self, maxsize: int = 128) -> None:
+        self.maxsize = maxsize
+        super().__init__()
+
+    def get(self, key, default=None):
+        try:
+            self.move_to_end(key)
+        except KeyError:
+            return default
+
+        return self[key]
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+# snapshot versions stay unique across evictions, process pool workers key their indexes on them
+_versions = itertools.count()
+
+
+class GuildPolicy:
+    """A guild's smart response settings, shared by every one of its support channels"""
+
+    __slots__ = ("guild_id", "channel_ids", "ignored_ids", "allow_all")
+
+    def __init__(self, guild_id: int, channel_ids: List[int], ignored_ids: List[int], allow_all: bool) -> None:
+        self.guild_id = guild_id
+        self.channel_ids = list(channel_ids)
+        self.ignored_ids = list(ignored_ids)
+        self.allow_all = allow_all
+
+    @classmethod
+    def from_record(cls, record: Response) -> GuildPolicy:
+        return cls(record.guild_id, record.valid_channel_ids, record.ignored_ids, record.allow_all)
+
+
+class CachedResponse:
+    """The parts of a ResponseData row a smart response needs, with its keywords normalized"""
+
+    __slots__ = ("id", "keywords", "content", "uses", "upvote", "downvote")
+
+    def __init__(self, record: ResponseData, keywords: Optional[Iterable[str]] = None) -> None:
+        self.id: int = record.id
+        # stored normalized in response_keyword, only rows without them are normalized here
+        if keywords is None:
+            keywords = map(normalize_keyword, record.keywords)
+        self.keywords: List[str] = list(keywords)
+        self.content: str = record.content
+        self.uses: int = record.uses
+        self.upvote: int = record.upvote
+        self.downvote: int = record.downvote
+
+
+class GuildSnapshot:
+    """A guild's responses keyed by normalized keyword, along with the matching index built over them.
+
+    ``keywords`` are the normalized keywords of each response by its id, as stored in response_keyword.
+    """
+
+    def __init__(
+        self,
+        records: Iterable[ResponseData],
+        keywords: Optional[Dict[int, List[str]]] = None,
+        *,
+        engine: str = MATCH_ENGINE,
+    ) -> None:
+        self.engine = engine
+        self.responses: Dict[int, CachedResponse] = {
+            record.id: CachedResponse(record, keywords.get(record.id, ()) if keywords is not None else None)
+            for record in records
+        }
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        self.keywords: Dict[str, CachedResponse] = {}
+        for response in self.responses.values():
+            for keyword in response.keywords:
+                # the oldest response keeps a keyword that got duplicated
+                self.keywords.setdefault(keyword, response)
+
+        self.index = MATCH_ENGINES[self.engine](self.keywords)
+        self.window_sizes = window_sizes(self.keywords)
+        self.version = next(_versions)
+
+        # outcome of recently seen messages by result_key, only valid for this keyword set
+        self.results: LRUCache[int, Optional[Match]] = LRUCache(256)
+
+    def put(self, record: ResponseData, keywords: Optional[Iterable[str]] = None) -> None:
+        """add or replace a response, its cached keywords are kept when ``keywords`` is left out"""
+        if keywords is None and (cached := self.responses.get(record.id)) is not None:
+            keywords = cached.keywords
+
+        self.responses[record.id] = CachedResponse(record, keywords)
+        self.rebuild()
+
+    def remove(self, response_id: int) -> None:
+        if self.responses.pop(response_id, None) is not None:
+            self.rebuild()
+
+
+class SnapshotCache:
+    """Guild snapshots in a bounded LRU.
+
+    There is no expiry, the response commands patch or invalidate a guild's snapshot
+    as they write, so the database is only read when a guild is first seen again.
+    """
+
+    def __init__(self, maxsize: int = 512) -> None:
+        self.maxsize = maxsize
+        self._snapshots: OrderedDict[int, GuildSnapshot] = OrderedDict()
+        self._loading: Dict[int, asyncio.Task] = {}
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._snapshots
+
+    async def get(self, guild_id: int) -> GuildSnapshot:
+        try:
+            self._snapshots.move_to_end(guild_id)
+        except KeyError:
+            pass
+        else:
+            return self._snapshots[guild_id]
+
+        # concurrent misses for the same guild share a single load
+        if (task := self._loading.get(guild_id)) is None:
+            task = self._loading[guild_id] = asyncio.ensure_future(self._load(guild_id))
+            task.add_done_callback(partial(self._forget, guild_id))
+
+        return await asyncio.shield(task)
+
+    def _forget(self, guild_id: int, task: asyncio.Task) -> None:
+        if self._loading.get(guild_id) is task:
+            del self._loading[guild_id]
+
+    async def _load(self, guild_id: int) -> GuildSnapshot:
+        record = await guild_configs.get(guild_id)
+        keywords: Dict[int, List[str]] = {}
+        rows = ResponseKeyword.filter(guild_id=guild_id).order_by("id").values_list("response_id", "keyword_normalized")
+        for response_id, keyword in await rows:
+            keywords.setdefault(response_id, []).append(keyword)
+
+        snapshot = GuildSnapshot(await record.data.all().order_by("id") if record is not None else [], keywords)
+
+        # a write during the load invalidated it, hand it out once but don't keep it
+        if self._loading.get(guild_id) is asyncio.current_task():
+            self._snapshots[guild_id] = snapshot
+            if len(self._snapshots) > self.maxsize:
+                self._snapshots.popitem(last=False)
+
+        return snapshot
+
+    def peek(self, guild_id: int) -> Optional[GuildSnapshot]:
+        """the guild's snapshot if it is cached, without loading or touching its LRU position"""
+        return self._snapshots.get(guild_id)
+
+    def put(self, guild_id: int, record: ResponseData, keywords: Optional[Iterable[str]] = None) -> None:
+        """add or replace a response in the guild's snapshot, if it is cached"""
+        self._loading.pop(guild_id, None)
+        if (snapshot := self._snapshots.get(guild_id)) is not None:
+            snapshot.put(record, keywords)
+
+    def remove(self, guild_id: int, response_id: int) -> None:
+        """drop a response from the guild's snapshot, if it is cached"""
+        self._loading.pop(guild_id, None)
+        if (snapshot := self._snapshots.get(guild_id)) is not None:
+            snapshot.remove(response_id)
+
+    def invalidate(self, guild_id: int) -> None:
+        self._snapshots.pop(guild_id, None)
+        self._loading.pop(guild_id, None)
+
+
+class GuildConfigCache:
+    """Response rows of recently used guilds in a bounded LRU, guilds without one are cached as ``None``.
+
+    The setup checks fill it and the commands after them read from it, every write
+    to a Response row goes through :meth:`put` (``Whiskey.cache_support_policy``).
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self._records: LRUCache[int, Optional[Response]] = LRUCache(maxsize)
+
+    async def get(self, guild_id: int) -> Optional[Response]:
+        record = self._records.get(guild_id, MISSING)
+        if record is MISSING:
+            record = self._records[guild_id] = await Response.get_or_none(guild_id=guild_id)
+
+        return record
+
+    def put(self, record: Response) -> None:
+        self._records[record.guild_id] = record
+
+    def invalidate(self, guild_id: int) -> None:
+        self._records.pop(guild_id, None)
+
+
+guild_configs = GuildConfigCache()
+guild_snapshots = SnapshotCache()
+
+
+async def get_guild_snapshot(guild_id: int) -> GuildSnapshot:
+    return await guild_snapshots.get(guild_id)
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import asyncio
+import traceback
+from collections import defaultdict
+from contextlib import suppress
+from typing import TYPE_CHECKING, DefaultDict, Dict, List, Optional, Set, Tuple
+
+import discord
+
+from .cache import LRUCache
+
+if TYPE_CHECKING:
+    from bot import Whiskey
+
+
+class ResponseCounters:
+    """Collects ResponseData uses/upvote/downvote increments in memory.
+
+    Every flush writes all of them with a single relative UPDATE, so concurrent
+    replies never overwrite each other's counts and heavy traffic costs one
+    write per interval instead of one per reply.
+    """
+
+    QUERY = """UPDATE response_data AS r
+        SET uses = r.uses + v.uses, upvote = r.upvote + v.upvote, downvote = r.downvote + v.downvote
+        FROM unnest($1::bigint[], $2::int[], $3::int[], $4::int[]) AS v(id, uses, upvote, downvote)
+        WHERE r.id = v.id"""
+
+    def __init__(self, bot: Whiskey, *, interval: float = 15.0) -> None:
+        self.bot = bot
+        self.interval = interval
+        self._pending: DefaultDict[int, List[int]] = defaultdict(lambda: [0, 0, 0])
+        self._task: Optional[asyncio.Task] = None
+        self._closing: Optional[asyncio.Event] = None
+
+    def add(self, response_id: int, *, uses: int = 0, upvote: int = 0, downvote: int = 0) -> None:
+        delta = self._pending[response_id]
+        delta[0] += uses
+        delta[1] += upvote
+        delta[2] += downvote
+
+    def start(self) -> None:
+        if self._task is None:
+            self._closing = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        # never cancelled, a flush cut short would lose the batch it took
+        while not self._closing.is_set():
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._closing.wait(), self.interval)
+
+            try:
+                await self.flush()
+            except Exception:
+                traceback.print_exc()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, defaultdict(lambda: [0, 0, 0])
+        ids = list(pending)
+        uses, upvotes, downvotes = zip(*pending.values())
+        try:
+            await self.bot.db.execute(self.QUERY, ids, uses, upvotes, downvotes)
+        except Exception:
+            # keep them for the next flush
+            for response_id, (_uses, upvote, downvote) in pending.items():
+                self.add(response_id, uses=_uses, upvote=upvote, downvote=downvote)
+            raise
+
+    async def close(self) -> None:
+        if self._task is not None:
+            # the loop finishes the flush it is in and makes a last one
+            self._closing.set()
+            await self._task
+            self._task = None
+
+        await self.flush()
+
+
+class SuggestionVotes:
+    """The members behind each suggestion's arrow reactions, kept up to date from reaction events.
+
+    Every event changes the suggestion's sets in memory, if they are loaded, and is written to
+    suggestion_vote along with the others of the interval in one transaction. Events missed
+    while the bot was down are only caught up on by :meth:`reconcile`, which pages through the
+    reactions once, the first time a suggestion's votes are needed after a start.
+    """
+
+    INSERT = """INSERT INTO suggestion_vote (suggestion_id, user_id, upvote)
+        SELECT v.id, v.user_id, v.upvote
+        FROM unnest($1::bigint[], $2::bigint[], $3::bool[]) AS v(id, user_id, upvote)
+        JOIN suggestions AS s ON s.message_id = v.id
+        ON CONFLICT DO NOTHING"""
+
+    DELETE = """DELETE FROM suggestion_vote AS sv
+        USING unnest($1::bigint[], $2::bigint[], $3::bool[]) AS v(id, user_id, upvote)
+        WHERE sv.suggestion_id = v.id AND sv.user_id = v.user_id AND sv.upvote = v.upvote"""
+
+    TALLY = """UPDATE suggestions AS s SET
+        upvotes = (SELECT count(*) FROM suggestion_vote WHERE suggestion_id = s.message_id AND upvote),
+        downvotes = (SELECT count(*) FROM suggestion_vote WHERE suggestion_id = s.message_id AND NOT upvote)
+        WHERE s.message_id = ANY($1::bigint[])"""
+
+    def __init__(self, bot: Whiskey, *, interval: float = 15.0, maxsize: int = 256) -> None:
+        self.bot = bot
+        self.interval = interval
+        # (upvoters, downvoters) of recently used suggestions
+        self._votes: LRUCache[int, Tuple[Set[int], Set[int]]] = LRUCache(maxsize)
+        # whether each (suggestion, member, upvote) was added or removed since the last flush
+        self._pending: Dict[Tuple[int, int, bool], bool] = {}
+        self._reconciled: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._closing: Optional[asyncio.Event] = None
+
+    def add(self, message_id: int, user_id: int, upvote: bool) -> None:
+        self._apply(message_id, user_id, upvote, True)
+
+    def remove(self, message_id: int, user_id: int, upvote: bool) -> None:
+        self._apply(message_id, user_id, upvote, False)
+
+    def _apply(self, message_id: int, user_id: int, upvote: bool, added: bool) -> None:
+        self._pending[(message_id, user_id, upvote)] = added
+        if (votes := self._votes.get(message_id)) is not None:
+            voters = votes[0] if upvote else votes[1]
+            if added:
+                voters.add(user_id)
+            else:
+                voters.discard(user_id)
+
+    def forget(self, message_id: int) -> None:
+        """its reactions were cleared or it is gone, the next :meth:`load` needs a :meth:`reconcile`"""
+        self._votes.pop(message_id, None)
+        self._reconciled.discard(message_id)
+
+    async def load(self, message_id: int) -> Optional[Tuple[Set[int], Set[int]]]:
+        """(upvoters, downvoters) of a suggestion, ``None`` if it hasn't been reconciled since the start"""
+        if (votes := self._votes.get(message_id)) is not None:
+            return votes
+
+        if message_id not in self._reconciled:
+            return None
+
+        votes = set(), set()
+        query = "SELECT user_id, upvote FROM suggestion_vote WHERE suggestion_id = $1"
+        for row in await self.bot.db.fetch(query, message_id):
+            votes[0 if row["upvote"] else 1].add(row["user_id"])
+
+        return self._cache(message_id, votes)
+
+    def _cache(self, message_id: int, votes: Tuple[Set[int], Set[int]]) -> Tuple[Set[int], Set[int]]:
+        # the events of the interval aren't in the table yet
+        for (_message_id, user_id, upvote), added in self._pending.items():
+            if _message_id == message_id:
+                voters = votes[0] if upvote else votes[1]
+                if added:
+                    voters.add(user_id)
+                else:
+                    voters.discard(user_id)
+
+        self._votes[message_id] = votes
+        return votes
+
+    async def reconcile(self, message: discord.Message, emojis: Tuple[str, str]) -> Tuple[Set[int], Set[int]]:
+        """replace a suggestion's votes with the users of its ``(upvote, downvote)`` reactions"""
+        # the reactions already show these, the ones from now on are applied on top of them
+        for key in [key for key in self._pending if key[0] == message.id]:
+            del self._pending[key]
+        self._votes.pop(message.id, None)
+
+        votes = set(), set()
+        for reaction in message.reactions:
+            if str(reaction.emoji) in emojis:
+                voters = votes[emojis.index(str(reaction.emoji))]
+                voters.update([user.id async for user in reaction.users() if user.id != self.bot.user.id])
+
+        user_ids = [*votes[0], *votes[1]]
+        upvotes = [True] * len(votes[0]) + [False] * len(votes[1])
+        async with self.bot.db.acquire() as con, con.transaction():
+            await con.execute("DELETE FROM suggestion_vote WHERE suggestion_id = $1", message.id)
+            await con.execute(self.INSERT, [message.id] * len(user_ids), user_ids, upvotes)
+            await con.execute(self.TALLY, [message.id])
+
+        self._reconciled.add(message.id)
+        return self._cache(message.id, votes)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._closing = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        # never cancelled, a flush cut short would lose the batch it took
+        while not self._closing.is_set():
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._closing.wait(), self.interval)
+
+            try:
+                await self.flush()
+            except Exception:
+                traceback.print_exc()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        added = [key for key, value in pending.items() if value]
+        removed = [key for key, value in pending.items() if not value]
+        # the rows of the others only hold the events since the start, their counts stay as imported
+        reconciled = [message_id for message_id in {key[0] for key in pending} if message_id in self._reconciled]
+        try:
+            async with self.bot.db.acquire() as con, con.transaction():
+                if added:
+                    await con.execute(self.INSERT, *zip(*added))
+                if removed:
+                    await con.execute(self.DELETE, *zip(*removed))
+                if reconciled:
+                    await con.execute(self.TALLY, reconciled)
+        except Exception:
+            # keep them for the next flush, unless a newer event replaced them
+            self._pending = {**pending, **self._pending}
+            raise
+
+    async def close(self) -> None:
+        if self._task is not None:
+            # the loop finishes the flush it is in and makes a last one
+            self._closing.set()
+            await self._task
+            self._task = None
+
+        await self.flush()
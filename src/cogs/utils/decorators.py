@@ -1,14 +1,14 @@
 from __future__ import annotations
 from typing import Optional
 
-from models import Response
+from .cache import guild_configs
 
 from discord.ext import commands
 
 
 def has_not_done_setup():
     async def predicate(ctx: commands.Context) -> Optional[bool]:
-        record = await Response.get_or_none(guild_id=ctx.guild.id)
+        record = await guild_configs.get(ctx.guild.id)
         if record:
             raise commands.CheckFailure(
                 f"You have already done the auto-response setup.\n\nUse `{ctx.prefix}rcreate` to create a response."
@@ -21,7 +21,7 @@ def has_not_done_setup():
 
 def has_done_setup():
     async def predicate(ctx: commands.Context) -> Optional[bool]:
-        record = await Response.get_or_none(guild_id=ctx.guild.id)
+        record = await guild_configs.get(ctx.guild.id)
         if not record:
             raise commands.CheckFailure(
                 f"This server do not have auto-response setup.\n\nUse `{ctx.prefix}rsetup` to setup."
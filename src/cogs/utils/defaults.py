@@ -1,8 +1,26 @@
 from __future__ import annotations
 
-from typing import Any, NamedTuple, List
+import asyncio
+import heapq
+import math
+import multiprocessing
+import re
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, NamedTuple, List, Optional, Sequence, Set, Tuple
 from discord import Member
 from difflib import get_close_matches as GCM, SequenceMatcher as SM
+from unicodedata import normalize
+
+if TYPE_CHECKING:
+    from .cache import GuildSnapshot
+
+try:
+    import numpy as np
+except ImportError:  # only the vector engine needs it
+    np = None
 
 
 class Match(NamedTuple):
@@ -15,8 +33,48 @@ def response_ignore_check(member: Member, ignored: List[int]) -> bool:
 
 
 
-def get_best_match(keywords: List[Any], sentence: str) -> List[Any]:
-    matches = GCM(sentence, keywords, cutoff=0.5)
+_clean_regex = re.compile(r"<@*#*!*&*\d+>|[^\w\s]")
+# only punctuation that ends a sentence, the dots of "node.js" or "v1.2" are stripped like in a keyword
+_sentence_regex = re.compile(r"[.!?]+(?=\s|$)|\n")
+
+
+# bump when normalize_keyword changes, the stored keywords are normalized again on the next start
+KEYWORD_NORMALIZATION = 1
+
+
+def normalize_keyword(keyword: str) -> str:
+    """NFKC, case folded, without mentions or punctuation and single spaced"""
+    return " ".join(_clean_regex.sub("", normalize("NFKC", keyword).casefold()).split())
+
+
+def normalize_message(content: str) -> str:
+    """:func:`normalize_keyword` for each sentence of a message, one sentence per line
+
+    Joined with spaces the lines are :func:`normalize_keyword` of the whole message.
+    """
+    content = normalize("NFKC", content).casefold()
+    sentences = (" ".join(_clean_regex.sub("", part).split()) for part in _sentence_regex.split(content))
+    return "\n".join(sentence for sentence in sentences if sentence)
+
+
+def result_key(text: str) -> int:
+    """what repeated copies of a normalized message share in a snapshot's result cache"""
+    return hash(text)
+
+
+def parse_keywords(text: str) -> Dict[str, str]:
+    """comma separated keywords by normalized form, the first spelling of each wins"""
+    keywords = {}
+    for keyword in text.split(","):
+        keyword = keyword.strip()
+        if len(keyword) < 100 and (normalized := normalize_keyword(keyword)):
+            keywords.setdefault(normalized, keyword)
+
+    return keywords
+
+
+def get_best_match(keywords: List[Any], sentence: str, cutoff: float = 0.5) -> List[Any]:
+    matches = GCM(sentence, keywords, cutoff=cutoff)
     if not matches:
         return None
 
@@ -28,6 +86,372 @@ def get_best_match(keywords: List[Any], sentence: str) -> List[Any]:
     return sorted(_list, key=lambda x: x.confidence, reverse=True)
 
 
+def best_matches(
+    keywords: Sequence[str], candidates: Iterable[int], bounds: Sequence[float], sentence: str, cutoff: float, n: int = 3
+) -> Optional[List[Match]]:
+    """What :func:`get_best_match` returns for ``keywords``, scoring only what has to be scored.
+
+    ``bounds`` are the ``SequenceMatcher.quick_ratio`` of every keyword against the sentence, an upper
+    bound of ``ratio``. ``candidates`` are the indexes of the keywords whose bound reaches the cutoff,
+    highest bound first, so the exact pass stops once no bound left can beat the current top ``n``.
+    """
+    s = SM()
+    s.set_seq2(sentence)
+
+    found = []
+    for idx in candidates:
+        if len(found) == n and bounds[idx] < found[0][0]:
+            break
+
+        keyword = keywords[idx]
+        s.set_seq1(keyword)
+        score = s.ratio()
+        if score < cutoff:
+            continue
+
+        if len(found) < n:
+            heapq.heappush(found, (score, keyword))
+        else:
+            heapq.heappushpop(found, (score, keyword))
+
+    if not found:
+        return None
+
+    return [Match(keyword, score * 100) for score, keyword in sorted(found, reverse=True)]
+
+
+def bigrams(text: str) -> Counter:
+    """the character pairs of ``text``, with one more at each end for its first and last character"""
+    text = f"\x02{text}\x03"
+    return Counter(text[i : i + 2] for i in range(len(text) - 1))
+
+
+class KeywordIndex:
+    """Bigram postings over a guild's keywords, sorted by length.
+
+    A keyword only reaches ``SequenceMatcher.ratio`` if three cheap filters can't rule it out:
+
+    * ``real_quick_ratio``, its length is within the range the cutoff allows for the sentence,
+      one contiguous slice of every posting list because the keywords are sorted by length.
+    * a count filter on the :func:`bigrams` it shares with the sentence. A matching block of ``L``
+      characters shares ``L - 1`` bigrams, one more when it starts or ends both strings, and blocks
+      are apart by at least one unmatched character, so ``shared >= 3 * M - (a + b) + 1`` for
+      ``M`` matched characters. With ``ratio = 2 * M / (a + b)`` that rules a keyword out without
+      losing a match for any cutoff above 2/3, below it every keyword in the length range is kept.
+    * ``quick_ratio``, which also orders the shortlist for the early exit of :func:`best_matches`.
+
+    All three are upper bounds of ``ratio``, so the matches are the same as :func:`get_best_match`.
+    """
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        self.keywords: List[str] = sorted(keywords, key=len)
+
+        self._lengths: List[int] = [len(keyword) for keyword in self.keywords]
+        self._words: List[int] = [len(keyword.split()) for keyword in self.keywords]
+        postings: Dict[str, Tuple[List[int], List[int]]] = defaultdict(lambda: ([], []))
+        for idx, keyword in enumerate(self.keywords):
+            for gram, count in bigrams(keyword).items():
+                indexes, counts = postings[gram]
+                indexes.append(idx)
+                counts.append(count)
+
+        self._postings = dict(postings)
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def length_range(self, size: int, cutoff: float) -> Tuple[int, int]:
+        """the slice of keywords whose ``real_quick_ratio`` against a sentence of ``size`` reaches the cutoff"""
+        if cutoff <= 0:
+            return 0, len(self.keywords)
+
+        shortest = math.ceil(size * cutoff / (2 - cutoff) - 1e-9)
+        longest = math.floor(size * (2 - cutoff) / cutoff + 1e-9)
+        return bisect_left(self._lengths, shortest), bisect_right(self._lengths, longest)
+
+    def shortlist(self, sentence: str, cutoff: float) -> Iterable[int]:
+        """indexes of the keywords the length range and the bigram count filter keep"""
+        start, stop = self.length_range(len(sentence), cutoff)
+        if cutoff <= 2 / 3:
+            return range(start, stop)
+
+        shared: Dict[int, int] = defaultdict(int)
+        for gram, query in bigrams(sentence).items():
+            if (posting := self._postings.get(gram)) is None:
+                continue
+
+            indexes, counts = posting
+            for i in range(bisect_left(indexes, start), bisect_left(indexes, stop)):
+                count = counts[i]
+                shared[indexes[i]] += count if count < query else query
+
+        size, lengths = len(sentence), self._lengths
+        return [
+            idx
+            for idx, count in shared.items()
+            if count >= 3 * math.ceil(cutoff * (lengths[idx] + size) / 2 - 1e-9) - lengths[idx] - size + 1
+        ]
+
+    def get_best_match(
+        self, sentence: str, cutoff: float = 0.5, *, max_words: Optional[int] = None
+    ) -> Optional[List[Match]]:
+        s = SM()
+        s.set_seq2(sentence)
+
+        bounds: Dict[int, float] = {}
+        for idx in self.shortlist(sentence, cutoff):
+            if max_words is not None and self._words[idx] > max_words:
+                continue
+
+            s.set_seq1(self.keywords[idx])
+            if (bound := s.quick_ratio()) >= cutoff:
+                bounds[idx] = bound
+
+        candidates = sorted(bounds, key=lambda idx: -bounds[idx])
+        return best_matches(self.keywords, candidates, bounds, sentence, cutoff)
+
+
+class KeywordList(list):
+    """The plain keyword list, scored linearly by :func:`get_best_match`"""
+
+    def __init__(self, keywords: Iterable[str] = ()) -> None:
+        super().__init__(keywords)
+        self._words: List[int] = [len(keyword.split()) for keyword in self]
+
+    def get_best_match(
+        self, sentence: str, cutoff: float = 0.5, *, max_words: Optional[int] = None
+    ) -> Optional[List[Match]]:
+        if max_words is None:
+            return get_best_match(self, sentence, cutoff)
+
+        keywords = [keyword for keyword, words in zip(self, self._words) if words <= max_words]
+        return get_best_match(keywords, sentence, cutoff)
+
+
+class VectorIndex:
+    """Character count matrix over a guild's keywords.
+
+    One sparse matrix-vector product gives ``SequenceMatcher.quick_ratio`` of the sentence
+    against every keyword. That is an upper bound of ``ratio``, so only the keywords whose
+    bound can still beat the current top three get an exact ``SequenceMatcher`` pass and the
+    confidences stay on the scale :func:`get_best_match` uses.
+    """
+
+    def __init__(self, keywords: Iterable[str], *, n: int = 3) -> None:
+        if np is None:
+            raise RuntimeError("numpy is required for the vector matching engine.")
+
+        self.keywords: List[str] = list(keywords)
+        self.n = n
+
+        self._vocab: Dict[str, int] = {}
+        rows, cols, counts = [], [], []
+        for idx, keyword in enumerate(self.keywords):
+            for char, count in Counter(keyword).items():
+                rows.append(idx)
+                cols.append(self._vocab.setdefault(char, len(self._vocab)))
+                counts.append(count)
+
+        self._rows = np.array(rows, dtype=np.int64)
+        self._cols = np.array(cols, dtype=np.int64)
+        self._counts = np.array(counts, dtype=np.int64)
+        self._lengths = np.array([len(keyword) for keyword in self.keywords], dtype=np.int64)
+        self._words = np.array([len(keyword.split()) for keyword in self.keywords], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def quick_ratios(self, sentence: str) -> np.ndarray:
+        query = np.zeros(len(self._vocab), dtype=np.int64)
+        for char, count in Counter(sentence).items():
+            if (col := self._vocab.get(char)) is not None:
+                query[col] = count
+
+        shared = np.bincount(
+            self._rows, weights=np.minimum(self._counts, query[self._cols]), minlength=len(self.keywords)
+        )
+        total = self._lengths + len(sentence)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(total, 2.0 * shared / total, 1.0)
+
+    def get_best_match(
+        self, sentence: str, cutoff: float = 0.5, *, max_words: Optional[int] = None
+    ) -> Optional[List[Match]]:
+        if not self.keywords:
+            return None
+
+        bounds = self.quick_ratios(sentence)
+        mask = bounds >= cutoff
+        if max_words is not None:
+            mask &= self._words <= max_words
+        candidates = np.flatnonzero(mask)
+        candidates = candidates[np.argsort(-bounds[candidates], kind="stable")]
+        return best_matches(self.keywords, candidates.tolist(), bounds, sentence, cutoff, self.n)
+
+
+MATCH_ENGINES = {"difflib": KeywordList, "postings": KeywordIndex, "vector": VectorIndex}
+
+
+def window_sizes(keywords: Iterable[str], *, limit: int = 3) -> Tuple[int, ...]:
+    """the most common keyword lengths in words, longest first"""
+    counts = Counter(len(keyword.split()) for keyword in keywords)
+    return tuple(sorted((size for size, _ in counts.most_common(limit) if size), reverse=True))
+
+
+def iter_windows(text: str, sizes: Sequence[int], *, limit: int = 128) -> Iterator[str]:
+    """Sentences of a normalized message in reading order.
+
+    Sentences longer than the longest keyword are broken into overlapping spans
+    as many words long as the guild's keywords usually are.
+    """
+    longest = max(sizes, default=1)
+    count = 0
+    for sentence in text.split("\n"):
+        words = sentence.split()
+        if len(words) <= longest:
+            spans = [sentence] if words else []
+        else:
+            spans = (
+                " ".join(words[i : i + size]) for i in range(len(words)) for size in sizes if i + size <= len(words)
+            )
+
+        for span in spans:
+            yield span
+            count += 1
+            if count >= limit:
+                return
+
+
+def find_match(
+    index: Any, text: str, *, sizes: Sequence[int] = (), threshold: float = 68.5, windowed: bool = False
+) -> Optional[Match]:
+    """The match a smart response should answer a message with, if any.
+
+    ``text`` is the message after :func:`normalize_message`, the keywords are expected to be normalized too.
+    Windowed matching, opt-in through ``MATCH_WINDOWED``, scores the windows of :func:`iter_windows`
+    in order and stops at the first one that clears the threshold. A window is only scored against
+    keywords with at most as many words as it has. The threshold is also the cutoff either way, so
+    keywords that can't reach it are never scored.
+    """
+    if not windowed:
+        matches = index.get_best_match(text.replace("\n", " "), threshold / 100)
+        if matches and matches[0].confidence >= threshold:
+            return matches[0]
+
+        return None
+
+    for window in iter_windows(text, sizes):
+        matches = index.get_best_match(window, threshold / 100, max_words=len(window.split()))
+        if matches and matches[0].confidence >= threshold:
+            return matches[0]
+
+    return None
+
+
+# (version, index, window sizes) per guild, lives in each process pool worker
+_worker_indexes: OrderedDict[int, Tuple[int, Any, Tuple[int, ...]]] = OrderedDict()
+
+
+def _match_in_worker(
+    guild_id: int,
+    version: int,
+    text: str,
+    engine: str,
+    threshold: float,
+    windowed: bool,
+    keywords: Optional[List[str]] = None,
+) -> Tuple[bool, Optional[Match]]:
+    cached = _worker_indexes.get(guild_id)
+    if cached is None or cached[0] != version:
+        if keywords is None:
+            return False, None
+
+        cached = _worker_indexes[guild_id] = (version, MATCH_ENGINES[engine](keywords), window_sizes(keywords))
+        if len(_worker_indexes) > 64:
+            _worker_indexes.popitem(last=False)
+
+    _worker_indexes.move_to_end(guild_id)
+    _, index, sizes = cached
+    return True, find_match(index, text, sizes=sizes, threshold=threshold, windowed=windowed)
+
+
+class OffloadedMatcher:
+    """Runs costly :func:`find_match` calls in a process pool, so a big guild or a pasted log can't stall the event loop.
+
+    The cost of a match is estimated as the message's length times the guild's keyword count,
+    cheaper matches run inline. Workers keep their own index for each guild, keyed by the
+    snapshot version, and are only sent the keywords when theirs is stale.
+
+    A match that takes longer than ``timeout`` seconds raises :exc:`asyncio.TimeoutError`.
+    A worker can't be stopped once it started, so it stays busy with the abandoned job. While
+    every worker is, matches that would go to the pool raise right away instead of queueing.
+    """
+
+    def __init__(
+        self,
+        engine: str,
+        *,
+        threshold: float = 68.5,
+        windowed: bool = False,
+        min_cost: int = 50_000,
+        timeout: float = 2.0,
+        max_workers: int = 2,
+    ) -> None:
+        self.engine = engine
+        self.threshold = threshold
+        self.windowed = windowed
+        self.min_cost = min_cost
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # jobs that timed out after a worker picked them up
+        self._abandoned: Set[Future] = set()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, forking a process that already runs the gateway threads isn't safe
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+        return self._executor
+
+    async def _run(self, call: partial) -> Tuple[bool, Optional[Match]]:
+        self._abandoned = {job for job in self._abandoned if not job.done()}
+        if len(self._abandoned) >= self.max_workers:
+            raise asyncio.TimeoutError
+
+        job = self.executor.submit(call)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(job), self.timeout)
+        except asyncio.TimeoutError:
+            # still queued it was cancelled with the wait, running it holds on to its worker
+            if not job.cancel():
+                self._abandoned.add(job)
+            raise
+
+    async def find_match(self, guild_id: int, snapshot: GuildSnapshot, text: str) -> Optional[Match]:
+        """:func:`find_match` for a message already through :func:`normalize_message`"""
+        if len(text) * len(snapshot.keywords) < self.min_cost:
+            return find_match(
+                snapshot.index, text, sizes=snapshot.window_sizes, threshold=self.threshold, windowed=self.windowed
+            )
+
+        # the version and its keywords are taken together, the snapshot may be rebuilt while the worker runs
+        keywords = snapshot.keywords
+        call = partial(_match_in_worker, guild_id, snapshot.version, text, self.engine, self.threshold, self.windowed)
+        found, match = await self._run(call)
+        if not found:
+            found, match = await self._run(partial(call, list(keywords)))
+
+        return match
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._abandoned.clear()
+
+
 async def aenumerate(asequence, start=1):
     """Asynchronously enumerate an async iterator from a given start value"""
     n = start
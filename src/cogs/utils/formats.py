@@ -1,9 +1,27 @@
 from __future__ import annotations
 
+import re
+from unicodedata import normalize
+
+from constants import DEADSHOT
+
 
 def truncate_string(value: str, max_length: int = 128, suffix: str = "...") -> str:
     string_value = str(value)
-    return string_value[:min(len(string_value), (max_length - len(suffix)))] + suffix if len(string_value) > max_length else ""
+    return string_value[:min(len(string_value), (max_length - len(suffix)))] + suffix if len(string_value) > max_length else string_value
+
+
+_nickname_regex = re.compile(r"[^a-zA-Z']+")
+
+
+def clean_nickname(name: str, member_id: int) -> str:
+    """the ASCII letters of a display name, what the head guild renames members to"""
+    name = _nickname_regex.sub(" ", normalize("NFKC", name).encode("ascii", "ignore").decode()).strip()
+    if name.lower() == "deadshot" and member_id != DEADSHOT:
+        return "imposter"
+
+    return name or "bad_nick"
+
 
 class TabularData:
     def __init__(self) -> None:
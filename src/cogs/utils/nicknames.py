@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+from typing import List, Optional, Tuple
+
+import discord
+
+from .formats import clean_nickname
+
+__all__ = ("NicknameCleaner",)
+
+
+class NicknameCleaner:
+    """Renames every member of a guild whose display name isn't clean yet.
+
+    The new names are worked out from the member cache up front, members that are
+    already clean never cost a request. The edits go out in member id order through
+    ``workers`` concurrent tasks, discord.py waits on the guild's member edit bucket
+    so a bigger pool only keeps that bucket busy, it can't go past it.
+
+    A cancelled job stops handing out edits and remembers the member id it got to,
+    :meth:`resume` starts a new job from there.
+    """
+
+    def __init__(self, guild: discord.Guild, *, workers: int = 4, cursor: int = 0) -> None:
+        self.guild = guild
+        self.workers = workers
+        self.cursor = cursor
+
+        self.pending: List[Tuple[int, str]] = []
+        self.total = self.edited = self.skipped = self.failed = 0
+        self.cancelled = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self._task is not None and self._task.done()
+
+    @property
+    def progress(self) -> str:
+        state = "cancelled" if self.cancelled else "done" if self.done else "running"
+        return (
+            f"Nickname cleanup {state}: {self.edited + self.skipped + self.failed}/{self.total} processed, "
+            f"{self.edited} renamed, {self.skipped} skipped, {self.failed} failed."
+        )
+
+    def plan(self) -> None:
+        """(member id, new name) of every member past the cursor that needs renaming"""
+        pending = []
+        for member in self.guild.members:
+            if member.bot or member.id <= self.cursor:
+                continue
+
+            name = clean_nickname(member.display_name, member.id)
+            if name != member.display_name:
+                pending.append((member.id, name))
+
+        pending.sort()
+        self.pending, self.total = pending, len(pending)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None:
+            self.plan()
+            self._task = asyncio.create_task(self._run())
+
+        return self._task
+
+    def cancel(self) -> None:
+        """stop after the edits already in flight"""
+        self.cancelled = True
+
+    def resume(self) -> NicknameCleaner:
+        return NicknameCleaner(self.guild, workers=self.workers, cursor=self.cursor)
+
+    async def _run(self) -> None:
+        queue: asyncio.Queue[Tuple[int, str]] = asyncio.Queue()
+        for item in self.pending:
+            queue.put_nowait(item)
+
+        await asyncio.gather(*(self._worker(queue) for _ in range(self.workers)))
+
+        # everything before the first member still queued has been handed out
+        if not queue.empty():
+            self.cursor = queue.get_nowait()[0] - 1
+        elif self.pending:
+            self.cursor = self.pending[-1][0]
+
+    async def _worker(self, queue: asyncio.Queue[Tuple[int, str]]) -> None:
+        while not self.cancelled and not queue.empty():
+            member_id, name = queue.get_nowait()
+            member = self.guild.get_member(member_id)
+            # left or was renamed since the plan was made
+            if member is None or member.display_name == name or clean_nickname(member.display_name, member_id) != name:
+                self.skipped += 1
+                continue
+
+            try:
+                await member.edit(nick=name, reason="nickname cleanup")
+            except discord.HTTPException:
+                self.failed += 1
+            else:
+                self.edited += 1
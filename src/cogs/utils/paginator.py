@@ -1,12 +1,127 @@
-import asyncio
 import contextlib
 import discord
 from constants import COLOR
 from discord.ext import commands
+from tortoise.queryset import QuerySet
+from typing import Any, Callable, Dict, List, Tuple
 
+from .cache import LRUCache
 
-class CannotPaginate(Exception):
-    pass
+
+class KeysetSource:
+    """Lazily fetched pages of a queryset, ordered by ``id``.
+
+    Only the total is counted upfront, :meth:`prepare` must be awaited before the source is paginated.
+    The id range of every page seen is kept, so the pages next to it are fetched with a ``WHERE id > / <``
+    instead of an offset, and the last few rendered pages are cached.
+    """
+
+    def __init__(
+        self,
+        queryset: QuerySet,
+        *,
+        per_page: int = 12,
+        format_entry: Callable[[int, Any], str] = lambda index, record: f"{record}",
+        cache_size: int = 8,
+    ) -> None:
+        self.queryset = queryset
+        self.per_page = per_page
+        self.format_entry = format_entry
+        self.total = 0
+
+        self._bounds: Dict[int, Tuple[int, int]] = {}
+        self._pages: LRUCache[int, List[str]] = LRUCache(cache_size)
+
+    async def prepare(self) -> int:
+        self.total = await self.queryset.count()
+        return self.total
+
+    @property
+    def maximum_pages(self) -> int:
+        return -(-self.total // self.per_page)
+
+    async def _fetch(self, page: int) -> List[Any]:
+        queryset, size = self.queryset, self.per_page
+        if page == 1:
+            return await queryset.order_by("id").limit(size)
+
+        if (bounds := self._bounds.get(page - 1)) is not None:
+            return await queryset.filter(id__gt=bounds[1]).order_by("id").limit(size)
+
+        if (bounds := self._bounds.get(page + 1)) is not None:
+            return (await queryset.filter(id__lt=bounds[0]).order_by("-id").limit(size))[::-1]
+
+        if page == self.maximum_pages:
+            return (await queryset.order_by("-id").limit(self.total - (page - 1) * size))[::-1]
+
+        # a jump to a page far from any seen
+        return await queryset.order_by("id").offset((page - 1) * size).limit(size)
+
+    async def get_page(self, page: int) -> List[str]:
+        entries = self._pages.get(page)
+        if entries is None:
+            records = await self._fetch(page)
+            if records:
+                self._bounds[page] = (records[0].id, records[-1].id)
+
+            start = 1 + (page - 1) * self.per_page
+            entries = self._pages[page] = [self.format_entry(idx, record) for idx, record in enumerate(records, start)]
+
+        return entries
+
+
+class PagesView(discord.ui.View):
+    """The buttons of a :class:`Pages` session, each click is answered by a single edit of its message."""
+
+    def __init__(self, pages: "Pages") -> None:
+        super().__init__(timeout=pages.delete_after or 180)
+        self.pages = pages
+
+        if pages.maximum_pages <= 2:
+            self.remove_item(self.first_page)
+            self.remove_item(self.last_page)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.pages.author.id:
+            await interaction.response.send_message("These pages aren't yours to turn.", ephemeral=True)
+            return False
+
+        return True
+
+    async def on_timeout(self) -> None:
+        self.pages.paginating = False
+        with contextlib.suppress(discord.HTTPException):
+            if self.pages.delete_after:
+                await self.pages.message.delete()
+            else:
+                await self.pages.message.edit(view=None)
+
+    async def turn(self, interaction: discord.Interaction, page: int) -> None:
+        if 0 < page <= self.pages.maximum_pages:
+            await self.pages.show_page(page, interaction=interaction)
+        else:
+            await interaction.response.defer()
+
+    @discord.ui.button(emoji="\U000023ee\U0000fe0f", style=discord.ButtonStyle.grey)
+    async def first_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self.turn(interaction, 1)
+
+    @discord.ui.button(emoji="\N{BLACK LEFT-POINTING TRIANGLE}", style=discord.ButtonStyle.grey)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self.turn(interaction, self.pages.current_page - 1)
+
+    @discord.ui.button(emoji="\U000023f9", style=discord.ButtonStyle.grey)
+    async def stop_pages(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await interaction.response.defer()
+        await self.pages.stop_pages()
+
+    @discord.ui.button(emoji="\N{BLACK RIGHT-POINTING TRIANGLE}", style=discord.ButtonStyle.grey)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self.turn(interaction, self.pages.current_page + 1)
+
+    @discord.ui.button(emoji="\U000023ed\U0000fe0f", style=discord.ButtonStyle.grey)
+    async def last_page(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self.turn(interaction, self.pages.maximum_pages)
 
 
 class Pages:
@@ -14,7 +129,8 @@ class Pages:
         self,
         ctx,
         *,
-        entries,
+        entries=None,
+        source=None,
         per_page=12,
         show_entry_count=True,
         embed_color=COLOR,
@@ -28,6 +144,8 @@ class Pages:
     ):
         self.bot = ctx.bot
         self.entries = entries
+        # a prepared KeysetSource, pages are fetched from it instead of sliced from entries
+        self.source = source
         self.message = ctx.message
         self.channel = ctx.channel
         self.author = author if author else ctx.author
@@ -38,21 +156,21 @@ class Pages:
         self.footertext = footertext
         self.title = title
         self.delete_after = delete_after
-        self.per_page = per_page
-        pages, left_over = divmod(len(self.entries), self.per_page)
-        if left_over:
-            pages += 1
-        self.maximum_pages = pages
+        if source is not None:
+            self.per_page = source.per_page
+            self.entry_count = source.total
+            self.maximum_pages = source.maximum_pages
+        else:
+            self.per_page = per_page
+            self.entry_count = len(self.entries)
+            pages, left_over = divmod(self.entry_count, self.per_page)
+            if left_over:
+                pages += 1
+            self.maximum_pages = pages
         self.embed = discord.Embed(colour=embed_color)
-        self.paginating = True
+        self.paginating = self.maximum_pages > 1
         self.show_entry_count = show_entry_count
-        self.reaction_emojis = [
-            ("\U000023ee\U0000fe0f", self.first_page),
-            ("\N{BLACK LEFT-POINTING TRIANGLE}", self.previous_page),
-            ("\U000023f9", self.stop_pages),
-            ("\N{BLACK RIGHT-POINTING TRIANGLE}", self.next_page),
-            ("\U000023ed\U0000fe0f", self.last_page),
-        ]
+        self.view = None
 
         if ctx.guild is not None:
             self.permissions = self.channel.permissions_for(ctx.guild.me)
@@ -65,18 +183,16 @@ class Pages:
         if not self.permissions.send_messages:
             raise commands.BotMissingPermissions("Bot cannot send messages.")
 
-        if self.paginating:
-            # verify we can actually use the pagination session
-            if not self.permissions.add_reactions:
-                raise commands.BotMissingPermissions("I do not have permissions to add reactions.")
-
-            if not self.permissions.read_message_history:
-                raise commands.BotMissingPermissions("I do not have permissions to Read Message History.")
-
     def get_page(self, page):
         base = (page - 1) * self.per_page
         return self.entries[base : base + self.per_page]
 
+    async def fetch_page(self, page):
+        if self.source is not None:
+            return await self.source.get_page(page)
+
+        return self.get_page(page)
+
     @staticmethod
     def get_content(entries, page, *, first=False):
         return None
@@ -92,7 +208,7 @@ class Pages:
 
         if self.maximum_pages > 1 and not self.footertext:
             if self.show_entry_count:
-                text = f"Showing page {page}/{self.maximum_pages} ({len(self.entries)} entries)"
+                text = f"Showing page {page}/{self.maximum_pages} ({self.entry_count} entries)"
             else:
                 text = f"Showing page {page}/{self.maximum_pages}"
 
@@ -101,136 +217,41 @@ class Pages:
         if self.footertext:
             self.embed.set_footer(text=self.footertext)
 
-        if self.paginating and first:
-            p.append("")
-
         self.embed.description = "".join(p)
-        self.embed.title = self.title or discord.Embed.Empty
+        self.embed.title = self.title
         if self.thumbnail:
             self.embed.set_thumbnail(url=self.thumbnail)
         if self.embed_author:
-            self.embed.set_author(icon_url=self.author.avatar_url, name=self.embed_author)
+            self.embed.set_author(icon_url=self.author.display_avatar.url, name=self.embed_author)
 
-    async def show_page(self, page, *, first=False):
+    async def show_page(self, page, *, first=False, interaction=None):
         self.current_page = page
-        entries = self.get_page(page)
+        entries = await self.fetch_page(page)
         content = self.get_content(entries, page, first=first)
         embed = self.get_embed(entries, page, first=first)
 
-        if not first:
-            await self.message.edit(content=content, embed=embed)
-            return
-
-        self.message = await self.channel.send(content=content, embed=embed)
-        for (reaction, _) in self.reaction_emojis:
-            if self.maximum_pages == 2 and reaction in ("\U000023ee\U0000fe0f", "\U000023ed\U0000fe0f"):
-                continue
-            if self.maximum_pages == 1 and reaction in (
-                "\U000023ee\U0000fe0f",
-                "\U000023ed\U0000fe0f",
-                "\N{BLACK RIGHT-POINTING TRIANGLE}",
-                "\N{BLACK LEFT-POINTING TRIANGLE}",
-            ):
-                continue
-
-            await self.message.add_reaction(reaction)
-
-    async def checked_show_page(self, page):
-        if page != 0 and page <= self.maximum_pages:
-            await self.show_page(page)
-
-    async def first_page(self):
-        """goes to the first page"""
-        await self.show_page(1)
-
-    async def last_page(self):
-        """goes to the last page"""
-        await self.show_page(self.maximum_pages)
-
-    async def next_page(self):
-        """goes to the next page"""
-        await self.checked_show_page(self.current_page + 1)
-
-    async def previous_page(self):
-        """goes to the previous page"""
-        await self.checked_show_page(self.current_page - 1)
-
-    async def show_current_page(self):
-        if self.paginating:
-            await self.show_page(self.current_page)
-
-    async def main_help(self):
-        """Goes to the main page of help"""
-        await self.stop_pages()
-        await self.context.send_help()
-
-    async def numbered_page(self):
-        """lets you type a page number to go to"""
-        to_delete = []
-        to_delete.append(await self.channel.send("What page do you want to go to?"))
-
-        def message_check(m):
-            return m.author == self.author and self.channel == m.channel and m.content.isdigit()
-
-        try:
-            msg = await self.bot.wait_for("message", check=message_check, timeout=30.0)
-        except asyncio.TimeoutError:
-            to_delete.append(await self.channel.send("Took too long."))
-            await asyncio.sleep(5)
+        if first:
+            self.message = await self.channel.send(content=content, embed=embed, view=self.view)
+        elif interaction is not None:
+            await interaction.response.edit_message(content=content, embed=embed)
         else:
-            page = int(msg.content)
-            to_delete.append(msg)
-            if page != 0 and page <= self.maximum_pages:
-                await self.show_page(page)
-            else:
-                to_delete.append(await self.channel.send(f"Invalid page given. ({page}/{self.maximum_pages})"))
-                await asyncio.sleep(5)
-
-        try:
-            await self.channel.delete_messages(to_delete)
-        except Exception:
-            pass
+            await self.message.edit(content=content, embed=embed)
 
     async def stop_pages(self):
         """stops the interactive pagination session"""
-        await self.message.delete()
         self.paginating = False
+        if self.view is not None:
+            self.view.stop()
 
-    def react_check(self, reaction, user):
-        if user is None or user.id != self.author.id:
-            return False
-
-        if reaction.message.id != self.message.id:
-            return False
-
-        for (emoji, func) in self.reaction_emojis:
-            if str(reaction.emoji) == emoji:
-                self.match = func
-                return True
-        return False
+        with contextlib.suppress(discord.HTTPException):
+            await self.message.delete()
 
     async def paginate(self):
-        """Actually paginate the entries and run the interactive loop if necessary."""
-        first_page = self.show_page(1, first=True)
-        # allow us to react to reactions right away if we're paginating
-        self.bot.loop.create_task(first_page)
-
-        while self.paginating:
-            try:
-                reaction, user = await self.bot.wait_for(
-                    "reaction_add", check=self.react_check, timeout=self.delete_after
-                )
-            except asyncio.TimeoutError:
-                self.paginating = False
-                try:
-                    await self.message.delete()
-                except Exception:
-                    pass
-                finally:
-                    break
-            with contextlib.suppress(Exception):
-                await self.message.remove_reaction(reaction, user)
-            await self.match()
+        """Send the first page, its buttons turn the pages from then on."""
+        if self.paginating:
+            self.view = PagesView(self)
+
+        await self.show_page(1, first=True)
 
 
 class FieldPages(Pages):
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import AbstractSet, Any, Dict, Iterable, List, Mapping, NamedTuple, Set, Tuple
+
+from discord.ext import commands
+
+from .defaults import parse_keywords
+from .formats import truncate_string
+
+__all__ = ("TRANSFER_FORMATS", "ImportedResponse", "dump_responses", "load_responses", "validate_import")
+
+TRANSFER_FORMATS = ("json", "csv")
+EXPORT_COLUMNS = ("id", "keywords", "content", "uses", "upvote", "downvote", "author_id", "created_at")
+
+# a single import is written in one transaction, this keeps it reasonably short
+MAX_IMPORT = 2000
+
+
+class ImportedResponse(NamedTuple):
+    keywords: Dict[str, str]
+    content: str
+
+
+def dump_responses(rows: Iterable[Mapping[str, Any]], fmt: str) -> bytes:
+    """response_data rows as a JSON or CSV file"""
+    if fmt == "json":
+        responses = [{**row, "created_at": row["created_at"].isoformat()} for row in rows]
+        return json.dumps({"responses": responses}, indent=2, ensure_ascii=False).encode()
+
+    fp = io.StringIO()
+    writer = csv.DictWriter(fp, EXPORT_COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({**row, "keywords": ", ".join(row["keywords"]), "created_at": row["created_at"].isoformat()})
+
+    return fp.getvalue().encode()
+
+
+def load_responses(data: bytes, fmt: str) -> List[Tuple[str, str]]:
+    """(comma separated keywords, content) of every response in an exported or hand written file"""
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise commands.CommandError("The file must be UTF-8 encoded.")
+
+    if fmt == "json":
+        try:
+            payload = json.loads(text)
+        except ValueError as e:
+            raise commands.CommandError(f"That isn't valid JSON: {e}")
+
+        entries = payload.get("responses") if isinstance(payload, dict) else payload
+        if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+            raise commands.CommandError('The JSON must be a list of `{"keywords": [...], "content": "..."}` objects.')
+
+    else:
+        reader = csv.DictReader(io.StringIO(text))
+        if not {"keywords", "content"} <= set(reader.fieldnames or ()):
+            raise commands.CommandError("The CSV needs a `keywords` and a `content` column.")
+
+        entries = list(reader)
+
+    if len(entries) > MAX_IMPORT:
+        raise commands.CommandError(f"You can import up to {MAX_IMPORT} responses at a time.")
+
+    responses = []
+    for entry in entries:
+        keywords = entry.get("keywords") or ""
+        if isinstance(keywords, list):
+            keywords = ",".join(map(str, keywords))
+
+        responses.append((str(keywords), str(entry.get("content") or "")))
+
+    return responses
+
+
+def validate_import(
+    responses: List[Tuple[str, str]], taken: Set[str], reserved: AbstractSet[str]
+) -> Tuple[List[ImportedResponse], List[str]]:
+    """The responses that can be imported and why the others can't.
+
+    A keyword already in ``taken`` or ``reserved`` (both normalized) or one claimed by an earlier
+    row of the file is dropped, a response left without keywords or content is skipped.
+    """
+    taken, valid, skipped = set(taken), [], []
+    for position, (keywords, content) in enumerate(responses, 1):
+        keywords = {
+            normalized: keyword
+            for normalized, keyword in parse_keywords(keywords).items()
+            if normalized not in taken and normalized not in reserved
+        }
+        if not keywords:
+            skipped.append(f"#{position}: no new keywords")
+            continue
+
+        if not content.strip():
+            skipped.append(f"#{position}: no content")
+            continue
+
+        taken.update(keywords)
+        valid.append(ImportedResponse(keywords, truncate_string(content, 3080)))
+
+    return valid, skipped
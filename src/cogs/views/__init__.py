@@ -1 +1,2 @@
 from .roles import SelfRoles
+from .votes import ResponseVotes, VoteButton
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import re
+
+import discord
+
+from cogs.utils.cache import guild_snapshots
+
+
+class VoteButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r"response:(?P<vote>up|down):(?P<response_id>[0-9]+):(?P<author_id>[0-9]+)",
+):
+    """A smart response vote, everything it needs lives in its custom_id so it keeps working across restarts."""
+
+    def __init__(self, vote: str, response_id: int, author_id: int) -> None:
+        self.vote = vote
+        self.response_id = response_id
+        self.author_id = author_id
+        super().__init__(
+            discord.ui.Button(
+                style=discord.ButtonStyle.grey,
+                emoji="\N{THUMBS UP SIGN}" if vote == "up" else "\N{THUMBS DOWN SIGN}",
+                custom_id=f"response:{vote}:{response_id}:{author_id}",
+            )
+        )
+
+    @classmethod
+    async def from_custom_id(
+        cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match[str]
+    ) -> VoteButton:
+        return cls(match["vote"], int(match["response_id"]), int(match["author_id"]))
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Only the person who asked can rate this response.", ephemeral=True)
+            return False
+
+        return True
+
+    async def callback(self, interaction: discord.Interaction) -> None:
+        upvote, downvote = (1, 0) if self.vote == "up" else (0, 1)
+        interaction.client.response_counters.add(self.response_id, upvote=upvote, downvote=downvote)
+
+        snapshot = guild_snapshots.peek(interaction.guild_id)
+        if snapshot is not None and (response := snapshot.responses.get(self.response_id)) is not None:
+            response.upvote += upvote
+            response.downvote += downvote
+
+        # dropping the buttons is what stops a second vote
+        await interaction.response.edit_message(view=None)
+
+
+class ResponseVotes(discord.ui.View):
+    def __init__(self, response_id: int, author_id: int) -> None:
+        super().__init__(timeout=None)
+        self.add_item(VoteButton("up", response_id, author_id))
+        self.add_item(VoteButton("down", response_id, author_id))
@@ -4,3 +4,13 @@ GENERAL = 829945755644592168
 DEADSHOT = 548163406537162782
 
 COLOR = 0x2F3136
+
+# one of cogs.utils.defaults.MATCH_ENGINES
+MATCH_ENGINE = "postings"
+# smart responses need at least this confidence
+MATCH_THRESHOLD = 68.5
+# score long messages sentence by sentence / in keyword sized spans, opt-in: short keywords
+# match inside almost any long message this way
+MATCH_WINDOWED = False
+# matches costing at least this many characters times keywords run in a process pool, about 3 ms inline
+OFFLOAD_MIN_COST = 50_000
@@ -1,3 +1,5 @@
+import typing
+
 from .fields import *
 from .functions import *
 from tortoise import models, fields
@@ -35,3 +37,77 @@ class ResponseData(models.Model):
     @property
     def author(self):
         return self.bot.get_user(self.author_id)
+
+
+class ResponseKeyword(models.Model):
+    """One row per keyword of a guild's responses, unique per guild once normalized"""
+
+    class Meta:
+        table = "response_keyword"
+        unique_together = (("guild_id", "keyword_normalized"),)
+
+    id = fields.BigIntField(pk=True)
+    guild_id = fields.BigIntField(index=True)
+    keyword = fields.CharField(max_length=100)
+    keyword_normalized = fields.CharField(max_length=100)
+    response: fields.ForeignKeyRelation[ResponseData] = fields.ForeignKeyField(
+        "models.ResponseData", related_name="keyword_rows", on_delete=fields.CASCADE
+    )
+
+    @classmethod
+    async def taken(
+        cls, guild_id: int, normalized: typing.Iterable[str], *, exclude: typing.Optional[int] = None
+    ) -> typing.List[str]:
+        """the normalized keywords the guild's responses already have, other than ``exclude``'s"""
+        query = cls.filter(guild_id=guild_id, keyword_normalized__in=list(normalized))
+        if exclude is not None:
+            query = query.exclude(response_id=exclude)
+
+        return await query.values_list("keyword_normalized", flat=True)
+
+    @classmethod
+    async def replace(cls, guild_id: int, response_id: int, keywords: typing.Dict[str, str]) -> None:
+        """set a response's rows to ``keywords``, original spellings by normalized form"""
+        await cls.filter(response_id=response_id).delete()
+        await cls.bulk_create(
+            [
+                cls(guild_id=guild_id, keyword=keyword, keyword_normalized=normalized, response_id=response_id)
+                for normalized, keyword in keywords.items()
+            ]
+        )
+
+
+class Suggestion(models.Model):
+    """A suggestion posted in the head guild's suggestion channel, by the id of its message there"""
+
+    class Meta:
+        table = "suggestions"
+
+    message_id = fields.BigIntField(pk=True)
+    author_id = fields.BigIntField(index=True)
+    content = fields.TextField()
+    # one of cogs.suggest.OTHER_REACTION, set by a moderator
+    status = fields.CharField(max_length=16, null=True)
+    remark = fields.TextField(null=True)
+    upvotes = fields.IntField(default=0)
+    downvotes = fields.IntField(default=0)
+    # the message's embed, edits are made from it instead of the fetched message
+    embed = fields.JSONField()
+    # the flag reactions on the message
+    flags = ArrayField(fields.CharField(max_length=32), default=list)
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+
+class SuggestionVote(models.Model):
+    """One arrow reaction on a suggestion, a member can have both"""
+
+    class Meta:
+        table = "suggestion_vote"
+        unique_together = (("suggestion", "user_id", "upvote"),)
+
+    id = fields.BigIntField(pk=True)
+    suggestion: fields.ForeignKeyRelation[Suggestion] = fields.ForeignKeyField(
+        "models.Suggestion", related_name="votes", on_delete=fields.CASCADE
+    )
+    user_id = fields.BigIntField()
+    upvote = fields.BooleanField()
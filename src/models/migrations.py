@@ -0,0 +1,87 @@
+"""Schema changes :meth:`Tortoise.generate_schemas` can't make on its own.
+
+Every step is idempotent, they run on each start after the missing tables were created.
+Steps that rewrite whole tables are recorded in ``whiskey_migration`` and only run when their version changes.
+"""
+from __future__ import annotations
+
+import asyncpg
+
+from cogs.utils.defaults import KEYWORD_NORMALIZATION, normalize_keyword
+
+__all__ = ("migrate",)
+
+
+async def backfill_keywords(pool: asyncpg.Pool) -> None:
+    """response_keyword rows for the responses created before the table existed"""
+    query = """SELECT l.response_info_id AS guild_id, d.id, d.keywords FROM response_data AS d
+        JOIN response_info_response_data AS l ON l.responsedata_id = d.id
+        WHERE NOT EXISTS (SELECT 1 FROM response_keyword AS k WHERE k.response_id = d.id)
+        ORDER BY d.id"""
+
+    rows = []
+    for record in await pool.fetch(query):
+        for keyword in record["keywords"]:
+            if normalized := normalize_keyword(keyword):
+                rows.append((record["guild_id"], keyword, normalized, record["id"]))
+
+    # the oldest response keeps a keyword that got duplicated
+    query = """INSERT INTO response_keyword (guild_id, keyword, keyword_normalized, response_id)
+        VALUES ($1, $2, $3, $4) ON CONFLICT (guild_id, keyword_normalized) DO NOTHING"""
+    await pool.executemany(query, rows)
+
+
+async def renormalize_keywords(connection: asyncpg.Connection) -> None:
+    """bring keyword_normalized in line with the current :func:`normalize_keyword`
+
+    Rows whose keyword now normalizes the same as an older row of the guild, or to nothing, are dropped.
+    """
+    seen, stale, dropped = set(), [], []
+    query = "SELECT id, guild_id, keyword, keyword_normalized, response_id FROM response_keyword ORDER BY id"
+    for row in await connection.fetch(query):
+        normalized = normalize_keyword(row["keyword"])
+        if not normalized or (row["guild_id"], normalized) in seen:
+            dropped.append(row["id"])
+            continue
+
+        seen.add((row["guild_id"], normalized))
+        if normalized != row["keyword_normalized"]:
+            stale.append((row["id"], row["guild_id"], row["keyword"], normalized, row["response_id"]))
+
+    if not stale and not dropped:
+        return
+
+    # rewritten rather than updated, an update could collide with a row that is about to change too
+    await connection.execute(
+        "DELETE FROM response_keyword WHERE id = ANY($1::bigint[])", dropped + [row[0] for row in stale]
+    )
+    query = """INSERT INTO response_keyword (id, guild_id, keyword, keyword_normalized, response_id)
+        VALUES ($1, $2, $3, $4, $5)"""
+    await connection.executemany(query, stale)
+
+
+async def run_versioned(pool: asyncpg.Pool, name: str, version: int, step) -> None:
+    """run ``step`` with a connection, in a transaction, unless it already ran at ``version``"""
+    async with pool.acquire() as connection, connection.transaction():
+        # held until the commit, a second process starting at the same time waits and then skips it
+        await connection.execute("SELECT pg_advisory_xact_lock(hashtext('whiskey_migration'))")
+        await connection.execute(
+            "CREATE TABLE IF NOT EXISTS whiskey_migration (name TEXT PRIMARY KEY, version INT NOT NULL)"
+        )
+        done = await connection.fetchval("SELECT version FROM whiskey_migration WHERE name = $1", name)
+        if done == version:
+            return
+
+        await step(connection)
+        await connection.execute(
+            """INSERT INTO whiskey_migration (name, version) VALUES ($1, $2)
+            ON CONFLICT (name) DO UPDATE SET version = excluded.version""",
+            name,
+            version,
+        )
+
+
+async def migrate(pool: asyncpg.Pool) -> None:
+    """run every step"""
+    await run_versioned(pool, "renormalize_keywords", KEYWORD_NORMALIZATION, renormalize_keywords)
+    await backfill_keywords(pool)
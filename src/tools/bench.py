@@ -0,0 +1,158 @@
+"""Offline benchmarks for the smart response matchers.
+
+Run from ``src``::
+
+    python -m tools.bench --sizes 10 1000 50000 --messages 500
+
+Every case gets one line with fixed columns (or one JSON object with ``--jsonl``),
+so two runs can be diffed across commits. Nothing here talks to Discord or Postgres.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import subprocess
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from cogs.utils import fuzzy
+from cogs.utils.cache import GuildSnapshot
+from cogs.utils.defaults import MATCH_ENGINES, find_match, normalize_message, result_key, window_sizes
+from constants import MATCH_THRESHOLD, MATCH_WINDOWED
+
+from .corpus import make_keywords, make_messages, make_records
+
+COLUMNS = ("case", "keywords", "messages", "p50_ms", "p95_ms", "p99_ms", "msg_per_s", "index_kib", "hits")
+FUZZY_SCORERS = ("ratio", "quick_ratio", "partial_ratio", "token_sort_ratio")
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, round(q * (len(values) - 1)))]
+
+
+def build(factory: Callable[[], Any]) -> Tuple[Any, int]:
+    """the built object and the bytes it allocated"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        obj = factory()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    return obj, size
+
+
+def measure(func: Callable[[str], Any], messages: List[str], budget: float) -> Tuple[List[float], int]:
+    """sorted per-message latencies in seconds and how many messages matched, stops early past ``budget`` seconds"""
+    latencies, hits, started = [], 0, time.perf_counter()
+    for message in messages:
+        t1 = time.perf_counter()
+        hits += func(message) is not None
+        latencies.append(time.perf_counter() - t1)
+        if time.perf_counter() - started > budget:
+            break
+
+    return sorted(latencies), hits
+
+
+def smart_response_path(snapshot: GuildSnapshot) -> Callable[[str], Any]:
+    """on_smart_response minus Discord: result cache, then find_match on a miss"""
+
+    def func(content: str) -> Any:
+        text = normalize_message(content)
+        key = result_key(text)
+        if key in snapshot.results:
+            return snapshot.results.get(key)
+
+        match = snapshot.results[key] = find_match(
+            snapshot.index, text, sizes=snapshot.window_sizes, threshold=MATCH_THRESHOLD, windowed=MATCH_WINDOWED
+        )
+        return match
+
+    return func
+
+
+def cases(size: int, args: argparse.Namespace) -> Iterator[Tuple[str, Callable[[str], Any], int]]:
+    keywords = make_keywords(size, seed=args.seed)
+    sizes = window_sizes(keywords)
+
+    for name, engine in MATCH_ENGINES.items():
+        try:
+            index, memory = build(lambda: engine(keywords))
+        except RuntimeError:  # numpy is missing
+            continue
+
+        yield name, lambda m, index=index: find_match(index, normalize_message(m), threshold=MATCH_THRESHOLD), memory
+        yield f"{name}+windowed", lambda m, index=index: find_match(
+            index, normalize_message(m), sizes=sizes, threshold=MATCH_THRESHOLD, windowed=True
+        ), memory
+
+    snapshot, memory = build(lambda: GuildSnapshot(make_records(keywords, seed=args.seed)))
+    yield "on_smart_response", smart_response_path(snapshot), memory
+
+    if size <= args.fuzzy_max:
+        for name in FUZZY_SCORERS:
+            scorer = getattr(fuzzy, name)
+            yield f"fuzzy.{name}", lambda m, scorer=scorer: fuzzy.extract_one(
+                m, keywords, scorer=scorer, score_cutoff=MATCH_THRESHOLD
+            ), 0
+
+
+def run(args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    for size in args.sizes:
+        messages = make_messages(make_keywords(size, seed=args.seed), args.messages, seed=args.seed)
+        for case, func, memory in cases(size, args):
+            latencies, hits = measure(func, messages, args.budget)
+            total = sum(latencies)
+            yield {
+                "case": case,
+                "keywords": size,
+                "messages": len(latencies),
+                "p50_ms": percentile(latencies, 0.50) * 1000,
+                "p95_ms": percentile(latencies, 0.95) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+                "msg_per_s": len(latencies) / total if total else 0.0,
+                "index_kib": memory / 1024,
+                "hits": hits,
+            }
+
+
+def revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 50000])
+    parser.add_argument("--messages", type=int, default=500, help="messages per case")
+    parser.add_argument("--budget", type=float, default=30.0, help="seconds per case before it is cut short")
+    parser.add_argument("--fuzzy-max", type=int, default=1000, help="largest guild the fuzzy.py scorers run on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jsonl", action="store_true", help="one JSON object per case instead of a table")
+    args = parser.parse_args()
+
+    print(f"# whiskey bench rev={revision()} seed={args.seed} messages={args.messages}")
+    if not args.jsonl:
+        print("{:<26}{:>9}{:>9}{:>10}{:>10}{:>10}{:>11}{:>11}{:>7}".format(*COLUMNS))
+
+    for row in run(args):
+        if args.jsonl:
+            print(json.dumps(row), flush=True)
+        else:
+            print(
+                "{case:<26}{keywords:>9}{messages:>9}{p50_ms:>10.3f}{p95_ms:>10.3f}{p99_ms:>10.3f}"
+                "{msg_per_s:>11.1f}{index_kib:>11.1f}{hits:>7}".format(**row),
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
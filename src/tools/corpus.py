@@ -0,0 +1,100 @@
+"""Synthetic guilds and support channel traffic, so the tools here run without Discord or a database."""
+from __future__ import annotations
+
+import random
+import string
+from types import SimpleNamespace
+from typing import List
+
+WORDS = (
+    "bot", "help", "setup", "prefix", "premium", "role", "roles", "channel", "command", "commands",
+    "error", "not", "working", "how", "to", "add", "remove", "change", "server", "invite", "link",
+    "permission", "permissions", "missing", "offline", "slow", "tag", "tags", "scrim", "scrims",
+    "register", "registration", "slot", "slots", "team", "teams", "points", "table", "tourney",
+    "tournament", "cancel", "claim", "reset", "refund", "payment", "vote", "votes", "embed", "message",
+    "messages", "delete", "edit", "ping", "mention", "mentions", "log", "logs", "ban", "kick", "mute",
+    "timeout", "verify", "verification", "ticket", "tickets", "giveaway", "music", "queue", "dashboard",
+    "login", "account", "id", "where", "why", "what", "is", "my", "the", "a", "i", "can", "do", "does",
+)
+
+CHATTER = (
+    "hi", "hello", "anyone here", "thanks", "ok", "lol", "good morning", "bro", "pls reply", "nvm",
+    "gg", "wait", "same issue", "anyone?", "yes", "no", "thank you so much", "it works now",
+)
+
+TEMPLATES = (
+    "{}",
+    "{}?",
+    "how do i {}",
+    "hey, {} pls",
+    "{} help",
+    "can someone tell me {}",
+    "i have a problem, {}. can anyone help?",
+)
+
+
+def _typo(rng: random.Random, text: str) -> str:
+    chars = list(text)
+    for _ in range(rng.choice((0, 0, 1, 1, 2))):
+        if not chars:
+            break
+        chars[rng.randrange(len(chars))] = rng.choice(string.ascii_lowercase)
+    return "".join(chars)
+
+
+def make_keywords(count: int, *, seed: int = 0) -> List[str]:
+    """``count`` distinct keywords, one to five words long"""
+    rng = random.Random(seed)
+    made_up = tuple("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(4000))
+    vocab = WORDS * 20 + made_up
+
+    keywords = {}
+    while len(keywords) < count:
+        size = rng.choice((1, 2, 2, 3, 3, 3, 4, 5))
+        keywords[" ".join(rng.choice(vocab) for _ in range(size))] = None
+
+    return list(keywords)
+
+
+def make_messages(
+    keywords: List[str], count: int, *, seed: int = 0, hit_rate: float = 0.3, paste_rate: float = 0.02
+) -> List[str]:
+    """Support channel traffic: questions built on keywords (with typos), chatter, repeats and pasted logs"""
+    rng = random.Random(seed)
+    messages = []
+    while len(messages) < count:
+        roll = rng.random()
+        if messages and roll < 0.1:
+            messages.append(rng.choice(messages))
+        elif roll < 0.1 + paste_rate:
+            frames = rng.randint(10, 60)
+            lines = (f'  File "bot.py", line {rng.randint(1, 900)}, in {rng.choice(WORDS)}' for _ in range(frames))
+            messages.append("Traceback (most recent call last):\n" + "\n".join(lines) + "\nRuntimeError: it broke")
+        elif roll < 0.1 + paste_rate + hit_rate and keywords:
+            messages.append(rng.choice(TEMPLATES).format(_typo(rng, rng.choice(keywords))))
+        else:
+            words = rng.choices(WORDS, k=rng.randint(2, 14))
+            messages.append(rng.choice(CHATTER) if rng.random() < 0.4 else " ".join(words))
+
+    return messages
+
+
+def make_records(keywords: List[str], *, seed: int = 0) -> List[SimpleNamespace]:
+    """Fake ResponseData rows owning ``keywords``, one to four keywords each"""
+    rng = random.Random(seed)
+    records, position = [], 0
+    while position < len(keywords):
+        size = rng.randint(1, 4)
+        records.append(
+            SimpleNamespace(
+                id=len(records) + 1,
+                keywords=keywords[position : position + size],
+                content=f"response {len(records) + 1}",
+                uses=0,
+                upvote=0,
+                downvote=0,
+            )
+        )
+        position += size
+
+    return records
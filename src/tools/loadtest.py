@@ -0,0 +1,518 @@
+"""End-to-end load test of the bot against a local stand-in for Discord.
+
+Run from ``src`` against a throwaway Postgres database::
+
+    python -m tools.loadtest --dsn postgres://whiskey@localhost/whiskey_load --guilds 20 --events 20000
+
+``Whiskey`` logs in against a local HTTP stub of Discord's REST API and never opens a gateway
+connection. Synthetic GUILD_CREATE, MESSAGE_CREATE and MESSAGE_REACTION_ADD payloads are fed
+to the connection state's parsers one per loop iteration, the way the gateway would, so every
+``on_message`` listener, the database and outbound HTTP all do their real work.
+
+The synthetic guilds use ids no real guild can have. Their responses are seeded before the
+run and deleted after it, unless ``--keep`` is passed. Reported are the sustained events/sec,
+event loop lag, database queries (ORM and raw pool), REST calls by route and listener errors.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+import sys
+import traceback
+import types
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from aiohttp import web
+from discord.http import Route
+from discord.utils import time_snowflake
+from tortoise import Tortoise
+
+try:
+    import config
+except ImportError:  # a checkout without a config.py, main sets everything the bot reads from it
+    config = sys.modules["config"] = types.ModuleType("config")
+
+from bot import Whiskey
+from cogs.suggest import OTHER_REACTION, SUGGESTION_CHANNEL_ID
+from cogs.utils.defaults import normalize_keyword
+from constants import GENERAL, HEAD_GUILD
+from models import Response, ResponseData, ResponseKeyword
+
+from .bench import percentile
+from .corpus import WORDS, make_keywords, make_messages, make_records
+
+# real snowflakes are far larger, nothing seeded here can collide with a real guild
+ID_BASE = 1_000_000
+BOT_ID = ID_BASE - 1
+MOD_ROLE_ID = 874328457167929386
+
+NICKNAMES = ("𝔡𝔯𝔲𝔫𝔨", "ｗｈｉｓｋｅｙ", "jack🥃", "deadshot", "x_x", "ŝŏbēr", "", "bartender")
+VOTE_EMOJI = ("\N{THUMBS UP SIGN}", "\N{THUMBS DOWN SIGN}")
+
+_route_ids = re.compile(r"\d+")
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def json_response(data: Any) -> web.Response:
+    # discord.py only decodes bodies typed exactly application/json, without a charset
+    return web.Response(body=json.dumps(data).encode(), content_type="application/json")
+
+
+def user_payload(user_id: int, name: str, *, bot: bool = False) -> Dict[str, Any]:
+    return {"id": str(user_id), "username": name, "discriminator": "0", "global_name": None, "avatar": None, "bot": bot}
+
+
+def member_payload(user: Dict[str, Any], roles: List[str], nick: Optional[str] = None) -> Dict[str, Any]:
+    return {"user": user, "nick": nick, "roles": roles, "joined_at": now(), "deaf": False, "mute": False, "flags": 0}
+
+
+class FakeDiscord:
+    """Discord's REST API as far as the bot uses it, answering every call with a plausible payload."""
+
+    def __init__(self) -> None:
+        self.calls: Counter[str] = Counter()
+        self.bot_user = user_payload(BOT_ID, "whiskey", bot=True)
+        self._ids = time_snowflake(datetime.now(timezone.utc))
+
+        self.app = web.Application()
+        self.app.router.add_route("*", "/api/v10/{path:.*}", self.handle)
+        self.runner = web.AppRunner(self.app, access_log=None)
+
+    def snowflake(self) -> int:
+        self._ids += 1
+        return self._ids
+
+    async def start(self) -> str:
+        """serve on a free local port and point discord.py at it"""
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self.runner.addresses[0][:2]
+        Route.BASE = f"http://{host}:{port}/api/v10"
+        return Route.BASE
+
+    async def close(self) -> None:
+        await self.runner.cleanup()
+
+    def message(self, channel_id: str, body: Dict[str, Any], message_id: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            "id": message_id or str(self.snowflake()),
+            "type": 0,
+            "channel_id": channel_id,
+            "author": self.bot_user,
+            "content": body.get("content") or "",
+            "timestamp": now(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": body.get("embeds") or [],
+            "components": body.get("components") or [],
+            "pinned": False,
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        path = request.match_info["path"]
+        self.calls[f"{request.method} /{_route_ids.sub('{id}', path)}"] += 1
+
+        body = await request.json() if request.content_type == "application/json" and request.can_read_body else {}
+        parts = path.split("/")
+
+        if path == "users/@me":
+            return json_response(self.bot_user)
+
+        if path == "oauth2/applications/@me":
+            return json_response(
+                {
+                    "id": str(BOT_ID),
+                    "name": "whiskey",
+                    "icon": None,
+                    "description": "",
+                    "rpc_origins": [],
+                    "bot_public": True,
+                    "bot_require_code_grant": False,
+                    "owner": user_payload(BOT_ID - 1, "owner"),
+                    "summary": "",
+                    "verify_key": "",
+                    "flags": 0,
+                    "team": None,
+                }
+            )
+
+        if parts[0] == "channels" and len(parts) == 3 and parts[2] == "messages":
+            if request.method == "POST":
+                return json_response(self.message(parts[1], body))
+            return json_response([])
+
+        if parts[0] == "channels" and len(parts) == 4 and parts[2] == "messages" and request.method == "PATCH":
+            return json_response(self.message(parts[1], body, parts[3]))
+
+        if parts[0] == "channels" and len(parts) == 4 and parts[2] == "messages" and request.method == "GET":
+            # the reactions land on messages nothing keeps, none of them is a suggestion
+            response = json_response({"message": "Unknown Message", "code": 10008})
+            response.set_status(404)
+            return response
+
+        if parts[0] == "guilds" and len(parts) == 4 and parts[2] == "members" and request.method == "PATCH":
+            return json_response(member_payload(user_payload(int(parts[3]), "member"), [], body.get("nick")))
+
+        # reactions, typing, interaction callbacks and whatever else only needs an acknowledgement
+        return web.Response(status=204)
+
+
+class Traffic:
+    """Synthetic guilds and the gateway events of their members."""
+
+    def __init__(self, args: argparse.Namespace, fake: FakeDiscord) -> None:
+        self.args = args
+        self.fake = fake
+        self.rng = random.Random(args.seed)
+
+        self.guilds: List[Dict[str, Any]] = []
+        for idx in range(args.guilds):
+            guild_id = ID_BASE + idx * 1000
+            self.guilds.append(
+                {
+                    "id": guild_id,
+                    "support_id": guild_id + 1,
+                    "chat_id": guild_id + 2,
+                    "ignored_role_id": guild_id + 3,
+                    "keywords": make_keywords(args.keywords, seed=args.seed + idx),
+                }
+            )
+
+        # the home guild, where every message goes through the nickname cleaner and suggestions live
+        self.head = {"id": HEAD_GUILD, "chat_id": GENERAL, "suggestion_id": SUGGESTION_CHANNEL_ID}
+
+        self.members: Dict[int, List[Dict[str, Any]]] = {}
+        for guild in (*self.guilds, self.head):
+            self.members[guild["id"]] = [self.member(guild, n) for n in range(args.members)]
+
+        self.contents = {
+            guild["id"]: make_messages(guild["keywords"], 500, seed=args.seed + guild["id"]) for guild in self.guilds
+        }
+        self.sent: List[Tuple[int, int, int]] = []
+
+    def member(self, guild: Dict[str, Any], n: int) -> Dict[str, Any]:
+        user_id = guild["id"] + 100 + n
+        roles = []
+        if (role_id := guild.get("ignored_role_id")) is not None and n % 10 == 0:
+            roles.append(str(role_id))
+        if guild["id"] == HEAD_GUILD and n % 25 == 0:
+            roles.append(str(MOD_ROLE_ID))
+
+        nick = self.rng.choice(NICKNAMES) if self.rng.random() < 0.3 else None
+        return member_payload(user_payload(user_id, f"{self.rng.choice(WORDS)}{n}"), roles, nick)
+
+    def guild_create(self, guild: Dict[str, Any]) -> Dict[str, Any]:
+        guild_id = guild["id"]
+        channel_ids = [v for k, v in guild.items() if k.endswith("_id") and not k.endswith("role_id")]
+        role_ids = [guild_id] + [v for k, v in guild.items() if k.endswith("role_id")]
+        if guild_id == HEAD_GUILD:
+            role_ids.append(MOD_ROLE_ID)
+
+        me = member_payload(self.fake.bot_user, [])
+        return {
+            "id": str(guild_id),
+            "name": f"guild {guild_id}",
+            "icon": None,
+            "owner_id": str(BOT_ID),
+            "roles": [
+                {
+                    "id": str(role_id),
+                    "name": "@everyone" if role_id == guild_id else str(role_id),
+                    "permissions": "0",
+                    "position": position,
+                    "color": 0,
+                    "hoist": False,
+                    "managed": False,
+                    "mentionable": False,
+                }
+                for position, role_id in enumerate(role_ids)
+            ],
+            "channels": [
+                {"id": str(channel_id), "type": 0, "name": str(channel_id), "position": n, "permission_overwrites": []}
+                for n, channel_id in enumerate(channel_ids)
+            ],
+            "members": [me, *self.members[guild_id]],
+            "member_count": len(self.members[guild_id]) + 1,
+            "large": False,
+            "emojis": [],
+            "stickers": [],
+            "features": [],
+            "threads": [],
+            "voice_states": [],
+            "presences": [],
+        }
+
+    def message_create(self, guild_id: int, channel_id: int, content: str) -> Dict[str, Any]:
+        member = self.rng.choice(self.members[guild_id])
+        message_id = self.fake.snowflake()
+        self.sent.append((guild_id, channel_id, message_id))
+        return {
+            **self.fake.message(str(channel_id), {"content": content}, str(message_id)),
+            "guild_id": str(guild_id),
+            "author": member["user"],
+            "member": {k: v for k, v in member.items() if k != "user"},
+        }
+
+    def reaction_add(self) -> Dict[str, Any]:
+        guild_id, channel_id, message_id = self.rng.choice(self.sent)
+        member = self.rng.choice(self.members[guild_id])
+        if guild_id == HEAD_GUILD and self.rng.random() < 0.5:
+            channel_id = SUGGESTION_CHANNEL_ID
+            emoji = self.rng.choice([flag["emoji"] for flag in OTHER_REACTION.values()])
+        else:
+            emoji = self.rng.choice(VOTE_EMOJI)
+
+        return {
+            "user_id": member["user"]["id"],
+            "channel_id": str(channel_id),
+            "message_id": str(message_id),
+            "guild_id": str(guild_id),
+            "member": member,
+            "emoji": {"id": None, "name": emoji},
+            "burst": False,
+            "type": 0,
+        }
+
+    def events(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """(kind, gateway event name, payload) for ``--events`` events"""
+        args, rng = self.args, self.rng
+        for _ in range(args.events):
+            roll = rng.random()
+            if self.sent and roll < args.reactions:
+                yield "reaction", "MESSAGE_REACTION_ADD", self.reaction_add()
+            elif roll < args.reactions + args.head * (1 - args.reactions) or not self.guilds:
+                words = " ".join(rng.choices(WORDS, k=rng.randint(2, 12)))
+                yield "head", "MESSAGE_CREATE", self.message_create(HEAD_GUILD, GENERAL, words)
+            else:
+                guild = rng.choice(self.guilds)
+                content = rng.choice(self.contents[guild["id"]])
+                if rng.random() < args.support:
+                    yield "support", "MESSAGE_CREATE", self.message_create(guild["id"], guild["support_id"], content)
+                else:
+                    yield "chat", "MESSAGE_CREATE", self.message_create(guild["id"], guild["chat_id"], content)
+
+
+class CountingPool:
+    """The asyncpg pool, counting the queries made on it directly"""
+
+    QUERIES = ("execute", "executemany", "fetch", "fetchrow", "fetchval", "copy_records_to_table", "acquire")
+
+    def __init__(self, pool: Any, calls: Counter[str]) -> None:
+        self._pool = pool
+        self._calls = calls
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._pool, name)
+        if name in self.QUERIES:
+            self._calls[f"pool.{name}"] += 1
+        return attr
+
+
+class QueryLog(logging.Handler):
+    """Counts the statements Tortoise logs, one debug record per query"""
+
+    def __init__(self, calls: Counter[str]) -> None:
+        super().__init__(logging.DEBUG)
+        self._calls = calls
+
+    def emit(self, record: logging.LogRecord) -> None:
+        query = str(record.args[0] if record.args else record.msg).lstrip()
+        self._calls[f"orm.{query.split(None, 1)[0].upper() if query else '?'}"] += 1
+
+
+class LoadTestWhiskey(Whiskey):
+    """Whiskey with its database and listener errors counted"""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(chunk_guilds_at_startup=False, **kwargs)
+        self.queries: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+
+    @property
+    def db(self):
+        return CountingPool(super().db, self.queries)
+
+    async def on_error(self, event_method: str, /, *args: Any, **kwargs: Any) -> None:
+        error = sys.exc_info()[1]
+        key = f"{event_method}: {type(error).__name__}"
+        if not self.errors[key]:
+            traceback.print_exc()
+        self.errors[key] += 1
+
+
+async def purge(bot: Whiskey, guild_ids: List[int]) -> None:
+    query = """DELETE FROM response_data WHERE id IN (
+        SELECT responsedata_id FROM response_info_response_data WHERE response_info_id = ANY($1::bigint[])
+    )"""
+    await bot.db.execute(query, guild_ids)
+    await Response.filter(guild_id__in=guild_ids).delete()
+
+
+async def seed(bot: Whiskey, traffic: Traffic) -> None:
+    await purge(bot, [guild["id"] for guild in traffic.guilds])
+    for guild in traffic.guilds:
+        record = await Response.create(
+            guild_id=guild["id"], valid_channel_ids=[guild["support_id"]], ignored_ids=[guild["ignored_role_id"]]
+        )
+        rows = [
+            await ResponseData.create(keywords=row.keywords, content=row.content, author_id=BOT_ID)
+            for row in make_records(guild["keywords"], seed=traffic.args.seed)
+        ]
+        await record.data.add(*rows)
+        for row in rows:
+            await ResponseKeyword.replace(guild["id"], row.id, {normalize_keyword(k): k for k in row.keywords})
+        bot.cache_support_policy(record)
+
+
+def pending_events() -> int:
+    """listener tasks discord.py has scheduled and that haven't finished yet"""
+    return sum(1 for task in asyncio.all_tasks() if task.get_name().startswith("discord.py: ") and not task.done())
+
+
+async def watch_loop(lags: List[float], backlog: List[int], interval: float = 0.01) -> None:
+    """how late the loop wakes a sleeping task, along with the listener backlog"""
+    loop = asyncio.get_running_loop()
+    while True:
+        t1 = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - t1 - interval)
+        backlog.append(pending_events())
+
+
+async def drive(bot: Whiskey, traffic: Traffic, rate: float) -> Tuple[Counter[str], float, float]:
+    """events sent by kind, seconds spent sending and seconds until every listener finished"""
+    loop = asyncio.get_running_loop()
+    parsers = bot._connection.parsers
+    kinds: Counter[str] = Counter()
+
+    started = loop.time()
+    for count, (kind, event, payload) in enumerate(traffic.events(), 1):
+        parsers[event](payload)
+        kinds[kind] += 1
+        # one event per loop iteration, as the gateway reads them
+        await asyncio.sleep(max(0.0, started + count / rate - loop.time()) if rate else 0)
+
+    sent = loop.time() - started
+    while pending_events():
+        await asyncio.sleep(0.01)
+
+    return kinds, sent, loop.time() - started
+
+
+async def run(args: argparse.Namespace) -> None:
+    config.TORTOISE = {
+        "connections": {"default": args.dsn},
+        "apps": {"models": {"models": ["models"], "default_connection": "default"}},
+    }
+
+    fake = FakeDiscord()
+    print(f"# fake Discord REST API at {await fake.start()}")
+
+    bot = LoadTestWhiskey()
+    query_log = QueryLog(bot.queries)
+    db_logger = logging.getLogger("db_client")
+    db_logger.addHandler(query_log)
+    db_logger.setLevel(logging.DEBUG)
+    db_logger.propagate = False
+
+    traffic = Traffic(args, fake)
+    try:
+        await bot.init_whiskey()
+        await bot.login("loadtest")
+        await seed(bot, traffic)
+
+        for guild in (*traffic.guilds, traffic.head):
+            bot._connection.parsers["GUILD_CREATE"](traffic.guild_create(guild))
+        bot._ready.set()
+        bot.dispatch("ready")
+        while pending_events():
+            await asyncio.sleep(0.01)
+
+        bot.queries.clear()
+        fake.calls.clear()
+        lags, backlog = [], []
+        watcher = asyncio.create_task(watch_loop(lags, backlog))
+        try:
+            kinds, sent, total = await drive(bot, traffic, args.rate)
+            await bot.response_counters.flush()
+        finally:
+            watcher.cancel()
+
+        report(args, kinds, sent, total, sorted(lags), max(backlog, default=0), bot, fake)
+
+        if not args.keep:
+            await purge(bot, [guild["id"] for guild in traffic.guilds])
+    finally:
+        db_logger.removeHandler(query_log)
+        await bot.close()
+        await Tortoise.close_connections()
+        await fake.close()
+
+
+def report(
+    args: argparse.Namespace,
+    kinds: Counter[str],
+    sent: float,
+    total: float,
+    lags: List[float],
+    backlog: int,
+    bot: LoadTestWhiskey,
+    fake: FakeDiscord,
+) -> None:
+    events = sum(kinds.values())
+    queries = sum(bot.queries.values())
+
+    print(f"guilds={args.guilds} keywords={args.keywords} members={args.members} rate={args.rate or 'flood'}")
+    print(f"{'events':<14}{events:>10}  " + "  ".join(f"{kind} {count}" for kind, count in sorted(kinds.items())))
+    print(f"{'offered':<14}{events / sent if sent else 0.0:>10.1f} ev/s  (sent in {sent:.2f}s)")
+    print(f"{'sustained':<14}{events / total if total else 0.0:>10.1f} ev/s  (drained in {total:.2f}s)")
+    print(f"{'backlog peak':<14}{backlog:>10} listener tasks")
+    print(
+        f"{'loop lag ms':<14}p50 {percentile(lags, 0.5) * 1000:.2f}  p95 {percentile(lags, 0.95) * 1000:.2f}"
+        f"  p99 {percentile(lags, 0.99) * 1000:.2f}  max {percentile(lags, 1.0) * 1000:.2f}"
+    )
+    print(f"{'db queries':<14}{queries:>10}  ({queries / max(events, 1):.3f} per event)")
+    for name, count in bot.queries.most_common():
+        print(f"{count:>24}  {name}")
+    print(f"{'rest calls':<14}{sum(fake.calls.values()):>10}")
+    for name, count in fake.calls.most_common():
+        print(f"{count:>24}  {name}")
+    print(f"{'errors':<14}{sum(bot.errors.values()):>10}")
+    for name, count in bot.errors.most_common():
+        print(f"{count:>24}  {name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", required=True, help="throwaway Postgres database, its schema is created if missing")
+    parser.add_argument("--guilds", type=int, default=20, help="synthetic guilds with smart responses")
+    parser.add_argument("--keywords", type=int, default=500, help="keywords per guild")
+    parser.add_argument("--members", type=int, default=200, help="members per guild")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--rate", type=float, default=0.0, help="events per second to offer, 0 sends them flat out")
+    parser.add_argument("--reactions", type=float, default=0.15, help="share of events that are reactions")
+    parser.add_argument("--head", type=float, default=0.2, help="share of messages sent in the home guild")
+    parser.add_argument("--support", type=float, default=0.7, help="share of other messages in support channels")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="leave the seeded responses in the database")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Replay recorded support channel traffic through the smart response decision.
+
+Run from ``src``::
+
+    python -m tools.replay messages.jsonl dump.json --threshold 70 --workers 4
+
+``messages.jsonl`` holds one message per line::
+
+    {"guild_id": 1, "channel_id": 2, "author_roles": [3, 4], "content": "bot is offline"}
+
+``dump.json`` is a dump of the response tables, for example::
+
+    psql -At -c "SELECT json_build_object(
+        'response_info', (SELECT json_agg(i) FROM response_info i),
+        'response_data', (SELECT json_agg(d) FROM response_data d),
+        'response_info_response_data', (SELECT json_agg(l) FROM response_info_response_data l)
+    )" > dump.json
+
+Every message goes through the same steps as ``WhiskeyEvents.on_smart_response``: the
+support channel policy, the ignore check, the guild snapshot's result cache and ``find_match``.
+Messages are replayed in batches per guild, optionally across processes.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from discord.utils import MISSING, SnowflakeList
+
+from cogs.utils.cache import GuildPolicy, GuildSnapshot
+from cogs.utils.defaults import find_match, normalize_message, response_ignore_check, result_key
+from constants import MATCH_ENGINE, MATCH_THRESHOLD, MATCH_WINDOWED
+
+from .bench import percentile
+
+
+def load_dump(path: str) -> Tuple[Dict[int, GuildPolicy], Dict[int, List[SimpleNamespace]]]:
+    """support channel policies by channel id and ResponseData rows by guild id"""
+    with open(path) as fp:
+        dump = json.load(fp)
+
+    data = {row["id"]: SimpleNamespace(**row) for row in dump["response_data"] or ()}
+    responses = defaultdict(list)
+    for link in sorted(dump["response_info_response_data"] or (), key=itemgetter("responsedata_id")):
+        if (record := data.get(link["responsedata_id"])) is not None:
+            responses[link["response_info_id"]].append(record)
+
+    channels = {}
+    for row in dump["response_info"] or ():
+        policy = GuildPolicy(row["guild_id"], row["valid_channel_ids"], row["ignored_ids"], row["allow_all"])
+        for channel_id in policy.channel_ids:
+            channels[channel_id] = policy
+
+    return channels, dict(responses)
+
+
+def load_messages(path: str) -> List[Dict[str, Any]]:
+    with open(path) as fp:
+        return [json.loads(line) for line in fp if line.strip()]
+
+
+def replay_guild(
+    records: List[SimpleNamespace], contents: List[str], engine: str, threshold: float, windowed: bool
+) -> List[Tuple[Optional[int], Optional[str], Optional[float], float]]:
+    """(response id, keyword, confidence, seconds) for each message of one guild, in order"""
+    snapshot = GuildSnapshot(records, engine=engine)
+
+    results = []
+    for content in contents:
+        t1 = time.perf_counter()
+        text = normalize_message(content)
+        key = result_key(text)
+        match = snapshot.results.get(key, MISSING) if text else None
+        if match is MISSING:
+            match = snapshot.results[key] = find_match(
+                snapshot.index, text, sizes=snapshot.window_sizes, threshold=threshold, windowed=windowed
+            )
+        elapsed = time.perf_counter() - t1
+
+        if match is None:
+            results.append((None, None, None, elapsed))
+        else:
+            results.append((snapshot.keywords[match.keyword].id, match.keyword, match.confidence, elapsed))
+
+    return results
+
+
+def route(
+    messages: List[Dict[str, Any]], channels: Dict[int, GuildPolicy]
+) -> Tuple[Dict[int, List[int]], List[str]]:
+    """message positions to match per guild, and what happened to every message before matching"""
+    batches, statuses = defaultdict(list), []
+    for position, message in enumerate(messages):
+        policy = channels.get(int(message["channel_id"]))
+        if policy is None or policy.guild_id != int(message["guild_id"]):
+            statuses.append("unrouted")
+            continue
+
+        author = SimpleNamespace(_roles=SnowflakeList(map(int, message.get("author_roles") or ()), is_sorted=False))
+        if response_ignore_check(author, policy.ignored_ids):
+            statuses.append("ignored")
+            continue
+
+        statuses.append("scored")
+        batches[policy.guild_id].append(position)
+
+    return batches, statuses
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("messages", help="JSONL log of support channel messages")
+    parser.add_argument("dump", help="JSON dump of the response tables")
+    parser.add_argument("--engine", default=MATCH_ENGINE)
+    parser.add_argument("--threshold", type=float, default=MATCH_THRESHOLD)
+    parser.add_argument("--windowed", dest="windowed", action="store_true", default=MATCH_WINDOWED)
+    parser.add_argument("--no-windowed", dest="windowed", action="store_false")
+    parser.add_argument("--workers", type=int, default=1, help="processes to spread guilds over")
+    parser.add_argument("--top", type=int, default=15, help="how many of the most fired responses to list")
+    parser.add_argument("--decisions", help="write every message's outcome to this JSONL file")
+    args = parser.parse_args()
+
+    channels, responses = load_dump(args.dump)
+    messages = load_messages(args.messages)
+    batches, statuses = route(messages, channels)
+
+    started = time.perf_counter()
+    outcomes: Dict[int, Tuple[Optional[int], Optional[str], Optional[float], float]] = {}
+    jobs = [
+        (positions, (responses.get(guild_id, []), [messages[p]["content"] for p in positions]))
+        for guild_id, positions in batches.items()
+    ]
+    options = (args.engine, args.threshold, args.windowed)
+    if args.workers > 1:
+        with ProcessPoolExecutor(args.workers) as executor:
+            futures = [(positions, executor.submit(replay_guild, *job, *options)) for positions, job in jobs]
+            for positions, future in futures:
+                outcomes.update(zip(positions, future.result()))
+    else:
+        for positions, job in jobs:
+            outcomes.update(zip(positions, replay_guild(*job, *options)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(outcome[3] for outcome in outcomes.values())
+    fired = Counter((outcome[0], outcome[1]) for outcome in outcomes.values() if outcome[0] is not None)
+    status_counts = Counter(statuses)
+    hits = sum(fired.values())
+
+    print(f"engine={args.engine} threshold={args.threshold} windowed={args.windowed}")
+    print(f"{'messages':<12}{len(messages):>10}")
+    print(f"{'unrouted':<12}{status_counts['unrouted']:>10}")
+    print(f"{'ignored':<12}{status_counts['ignored']:>10}")
+    print(f"{'scored':<12}{status_counts['scored']:>10}")
+    print(f"{'hits':<12}{hits:>10}  ({hits / max(len(outcomes), 1):.1%} of scored)")
+    print(
+        f"{'latency ms':<12}p50 {percentile(latencies, 0.5) * 1000:.3f}  p95 {percentile(latencies, 0.95) * 1000:.3f}"
+        f"  p99 {percentile(latencies, 0.99) * 1000:.3f}  max {percentile(latencies, 1.0) * 1000:.3f}"
+    )
+    print(f"{'throughput':<12}{len(outcomes) / wall if wall else 0.0:.1f} msg/s  (wall {wall:.2f}s)")
+
+    print("top responses")
+    for (response_id, keyword), count in fired.most_common(args.top):
+        print(f"{count:>8}  #{response_id:<10} {keyword}")
+
+    if args.decisions:
+        with open(args.decisions, "w") as fp:
+            for position, status in enumerate(statuses):
+                response_id, keyword, confidence, _ = outcomes.get(position, (None, None, None, 0.0))
+                row = dict(position=position, status=status, response_id=response_id, keyword=keyword)
+                fp.write(json.dumps({**row, "confidence": confidence}) + "\n")
+
+
+if __name__ == "__main__":
+    main()